@@ -8,7 +8,7 @@ from alembic import context
 
 from sqlmodel import SQLModel
 from app.databasesetup import engine, ASYNC_DATABASE_URL
-from app.model.country_table import Country, SummaryCache
+from app.model.country_table import Country, SummaryCache, SummaryImage, CountryAggregate, RefreshJob
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
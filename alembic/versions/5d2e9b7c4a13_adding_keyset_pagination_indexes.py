@@ -0,0 +1,33 @@
+"""adding keyset pagination indexes
+
+Revision ID: 5d2e9b7c4a13
+Revises: cc1b79a8ac6b
+Create Date: 2026-10-17 10:05:12.418233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e9b7c4a13'
+down_revision: Union[str, Sequence[str], None] = 'cc1b79a8ac6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_country_gdp_id', 'country', ['estimated_gdp', 'id'], unique=False)
+    op.create_index('ix_country_region_gdp_id', 'country', ['region', 'estimated_gdp', 'id'], unique=False)
+    op.create_index('ix_country_currency_gdp_id', 'country', ['currency_code', 'estimated_gdp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_country_currency_gdp_id', table_name='country')
+    op.drop_index('ix_country_region_gdp_id', table_name='country')
+    op.drop_index('ix_country_gdp_id', table_name='country')
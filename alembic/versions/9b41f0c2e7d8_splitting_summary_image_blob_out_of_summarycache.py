@@ -0,0 +1,64 @@
+"""splitting summary image blob out of summarycache
+
+Revision ID: 9b41f0c2e7d8
+Revises: 5d2e9b7c4a13
+Create Date: 2026-10-17 11:42:37.905114
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision: str = '9b41f0c2e7d8'
+down_revision: Union[str, Sequence[str], None] = '5d2e9b7c4a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('summaryimage',
+    sa.Column('image_hash', sa.String(length=64), nullable=False),
+    sa.Column('image_data', sa.LargeBinary(), nullable=False),
+    sa.PrimaryKeyConstraint('image_hash')
+    )
+    op.add_column('summarycache', sa.Column('total_countries', sa.Integer(), nullable=True))
+    op.add_column('summarycache', sa.Column('image_hash', sa.String(length=64), nullable=True))
+
+    # Move existing PNGs into the content-addressed table
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, summary_image_data FROM summarycache")).fetchall()
+    for row_id, image_data in rows:
+        if not image_data:
+            continue
+        image_hash = hashlib.sha256(image_data).hexdigest()
+        exists = conn.execute(
+            sa.text("SELECT 1 FROM summaryimage WHERE image_hash = :h"), {"h": image_hash}
+        ).first()
+        if not exists:
+            conn.execute(
+                sa.text("INSERT INTO summaryimage (image_hash, image_data) VALUES (:h, :d)"),
+                {"h": image_hash, "d": image_data},
+            )
+        conn.execute(
+            sa.text("UPDATE summarycache SET image_hash = :h WHERE id = :id"), {"h": image_hash, "id": row_id}
+        )
+
+    op.drop_column('summarycache', 'summary_image_data')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('summarycache', sa.Column('summary_image_data', mysql.BLOB(), nullable=True))
+    op.execute(
+        "UPDATE summarycache SET summary_image_data = "
+        "(SELECT image_data FROM summaryimage WHERE summaryimage.image_hash = summarycache.image_hash)"
+    )
+    op.drop_column('summarycache', 'image_hash')
+    op.drop_column('summarycache', 'total_countries')
+    op.drop_table('summaryimage')
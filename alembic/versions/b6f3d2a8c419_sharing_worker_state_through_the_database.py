@@ -0,0 +1,49 @@
+"""sharing worker state through the database
+
+Revision ID: b6f3d2a8c419
+Revises: e3a7c5d91f20
+Create Date: 2026-10-17 16:02:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6f3d2a8c419'
+down_revision: Union[str, Sequence[str], None] = 'e3a7c5d91f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('summarycache', sa.Column('data_generation', sa.BigInteger(), server_default='0', nullable=False))
+    op.add_column('summarycache', sa.Column('upstream_validators', sa.JSON(), nullable=True))
+    op.create_table('refreshjob',
+    sa.Column('job_id', sa.String(length=36), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('trigger', sa.String(length=16), nullable=False),
+    sa.Column('force', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('stage_timings_ms', sa.JSON(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_refreshjob_status'), 'refreshjob', ['status'], unique=False)
+    op.create_index(op.f('ix_refreshjob_created_at'), 'refreshjob', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_refreshjob_created_at'), table_name='refreshjob')
+    op.drop_index(op.f('ix_refreshjob_status'), table_name='refreshjob')
+    op.drop_table('refreshjob')
+    op.drop_column('summarycache', 'upstream_validators')
+    op.drop_column('summarycache', 'data_generation')
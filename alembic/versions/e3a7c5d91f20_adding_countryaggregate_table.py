@@ -0,0 +1,41 @@
+"""adding countryaggregate table
+
+Revision ID: e3a7c5d91f20
+Revises: 9b41f0c2e7d8
+Create Date: 2026-10-17 14:18:51.602417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c5d91f20'
+down_revision: Union[str, Sequence[str], None] = '9b41f0c2e7d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Left empty: the next refresh populates it
+    op.create_table('countryaggregate',
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('country_count', sa.Integer(), nullable=False),
+    sa.Column('population_sum', sa.BigInteger(), nullable=False),
+    sa.Column('gdp_sum', sa.Double(), nullable=True),
+    sa.Column('gdp_min', sa.Double(), nullable=True),
+    sa.Column('gdp_max', sa.Double(), nullable=True),
+    sa.Column('top_countries', sa.JSON(), nullable=False),
+    sa.Column('last_refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('countryaggregate')
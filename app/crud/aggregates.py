@@ -0,0 +1,150 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from fastapi import HTTPException, status
+from sqlmodel import select, func, and_
+from sqlalchemy import delete, insert
+from ..model.country_table import Country, CountryAggregate
+from ..sec import AGGREGATE_TOP_N
+
+# Dimension name (as stored and used in the URLs) -> grouped Country column
+AGGREGATE_DIMENSIONS = {
+    "region": Country.region,
+    "currency": Country.currency_code,
+}
+
+
+def normalize_aggregate_key(dimension: str, key: str) -> str:
+    """Same normalization as the Country validators: title-case region, upper-case currency."""
+    key = key.strip()
+    return key.upper() if dimension == "currency" else key.title()
+
+
+async def _group_totals(session, column, keys: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+    """Count, population and GDP totals per key in one GROUP BY."""
+    condition = column.isnot(None) if keys is None else column.in_(keys)
+    stmt = (
+        select(
+            column.label("key"),
+            func.count(Country.id).label("country_count"),
+            func.sum(Country.population).label("population_sum"),
+            func.sum(Country.estimated_gdp).label("gdp_sum"),
+            func.min(Country.estimated_gdp).label("gdp_min"),
+            func.max(Country.estimated_gdp).label("gdp_max"),
+        )
+        .where(condition)
+        .group_by(column)
+    )
+    result = await session.execute(stmt)
+    return {row.key: row._asdict() for row in result.all()}
+
+
+async def _group_top(session, column, keys: Optional[List[str]], top_n: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Top-N countries by estimated GDP per key, with one ROW_NUMBER() window query."""
+    condition = column.isnot(None) if keys is None else column.in_(keys)
+    rank = func.row_number().over(
+        partition_by=column, order_by=(Country.estimated_gdp.desc(), Country.id)
+    ).label("rank")
+    ranked = (
+        select(column.label("key"), Country.name, Country.estimated_gdp, rank)
+        .where(and_(condition, Country.estimated_gdp.isnot(None)))
+        .subquery()
+    )
+    stmt = select(ranked.c.key, ranked.c.name, ranked.c.estimated_gdp).where(ranked.c.rank <= top_n).order_by(ranked.c.key, ranked.c.rank)
+    result = await session.execute(stmt)
+    top: Dict[str, List[Dict[str, Any]]] = {}
+    for row in result.all():
+        top.setdefault(row.key, []).append({"name": row.name, "estimated_gdp": row.estimated_gdp})
+    return top
+
+
+async def rebuild_aggregates(session, refreshed_at: datetime, keys: Optional[Dict[str, Iterable[str]]] = None, top_n: int = AGGREGATE_TOP_N) -> int:
+    """
+    Recomputes the aggregate rows from the country table, staged in the
+    caller's transaction (the caller commits). keys limits the rebuild to the
+    given {dimension: [key, ...]} (e.g. the region and currency of a deleted
+    country); None rebuilds everything. Returns the number of rows written.
+    """
+    written = 0
+    for dimension, column in AGGREGATE_DIMENSIONS.items():
+        dimension_keys = None
+        if keys is not None:
+            dimension_keys = [key for key in keys.get(dimension, ()) if key is not None]
+            if not dimension_keys:
+                continue
+
+        totals = await _group_totals(session, column, dimension_keys)
+        top = await _group_top(session, column, dimension_keys, top_n)
+
+        # Replace the rows of the dimension (or of the given keys): groups that
+        # no longer have any country simply are not written back
+        stale = delete(CountryAggregate).where(CountryAggregate.dimension == dimension)
+        if dimension_keys is not None:
+            stale = stale.where(CountryAggregate.key.in_(dimension_keys))
+        await session.execute(stale)
+
+        rows = [
+            {
+                "dimension": dimension,
+                "key": key,
+                "country_count": values["country_count"],
+                "population_sum": int(values["population_sum"] or 0),
+                "gdp_sum": values["gdp_sum"],
+                "gdp_min": values["gdp_min"],
+                "gdp_max": values["gdp_max"],
+                "top_countries": top.get(key, []),
+                "last_refreshed_at": refreshed_at,
+            }
+            for key, values in totals.items()
+        ]
+        if rows:
+            await session.execute(insert(CountryAggregate), rows)
+        written += len(rows)
+    return written
+
+
+def _check_dimension(dimension: str) -> None:
+    if dimension not in AGGREGATE_DIMENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={ "error": "Validation failed" }
+        )
+
+
+async def list_aggregates(dimension: str, session) -> List[CountryAggregate]:
+    """All aggregate rows of a dimension, ordered by key."""
+    _check_dimension(dimension)
+    try:
+        result = await session.execute(
+            select(CountryAggregate).where(CountryAggregate.dimension == dimension).order_by(CountryAggregate.key)
+        )
+        return result.scalars().all()
+    except Exception as e:
+        print(f"Error listing {dimension} aggregates: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+
+
+async def get_aggregate(dimension: str, key: str, session) -> CountryAggregate:
+    """One aggregate row by primary key (dimension, key)."""
+    _check_dimension(dimension)
+    if not key.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={ "error": "Validation failed" }
+        )
+    try:
+        aggregate = await session.get(CountryAggregate, (dimension, normalize_aggregate_key(dimension, key)))
+    except Exception as e:
+        print(f"Error retrieving {dimension} aggregate '{key}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+    if aggregate is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={ "error": "Aggregate not found" }
+        )
+    return aggregate
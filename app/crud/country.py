@@ -1,61 +1,59 @@
-from ..utils.country import fetch_and_process_country_data
-from ..model.country_table import Country, SummaryCache
+from ..utils.country import (
+    open_country_stream, process_country_payload, processing_batch_size, gdp_rng,
+    adopt_upstream_validators, upstream_validators_to_apply, upstream_validators_changed,
+    commit_upstream_validators, reset_upstream_validators,
+)
+from .upsert import upsert_countries, delete_countries_by_name
+from .diff import DIFF_FIELDS, diff_country_batch, count_missing_countries, delete_missing_countries, reset_seen_names, drop_seen_names
+from .aggregates import rebuild_aggregates
+from .shared_state import (
+    sync_shared_state, bump_shared_generation, load_upstream_validators, save_upstream_validators,
+    stamp_unchanged_refresh,
+)
+from ..model.country_table import Country, SummaryCache, SummaryImage
 from sqlmodel import select, func, and_
+from sqlalchemy import delete
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
-from fastapi import HTTPException, status, Response
 import asyncio
-from ..schema.country import ResStatus
-
-from PIL import Image, ImageDraw, ImageFont # Requires 'Pillow' installed
-from io import BytesIO # Used for in-memory binary streams
-
-# ... (other imports) ...
+from fastapi import HTTPException, status
+from ..schema.country import ResStatus, Count
+from ..sec import REFRESH_BATCH_SIZE, REFRESH_DELETE_MISSING, REFRESH_DELETE_MAX_FRACTION, STREAM_CHUNK_ROWS
+from ..utils.cache import countries_cache, current_generation, bump_generation
+from ..utils.pagination import decode_cursor, apply_keyset, gdp_sort_key, cursor_for_row
+
+from ..utils.summary_image import render_summary_image, truncate_timestamp
+from ..utils.image_cache import image_response, publish_image, image_digest
+from ..utils.metrics import StageTimer
+from ..utils.database import merge_scalar_selects
+from ..utils.json_encoding import dumps_bytes, dumps_lines
+from ..utils.compression import EncodedBody
+from ..utils.singleflight import coalesce
 
 async def generate_summary_image_data(refresh_time, session):
     """
-    Generates the summary image and text, returning the binary data and text.
+    Generates the summary image and text and stages the SummaryCache row.
+    The PNG is rendered in a worker thread, or reused when the inputs are unchanged.
     """
     try:
         try:
-            #optimizing speed
-            # Define concurrent queries
-            count_stmt = select(func.count(Country.id)).select_from(Country)
-            top_5_stmt = select(Country).order_by(Country.estimated_gdp.desc()).limit(5)
+            # 1. Count and top 5 in one round trip (the count rides along as a
+            # scalar subquery). These must run on this session, not fanned out
+            # over other connections: the upserted rows are not committed yet.
+            total_stmt = select(func.count(Country.id)).scalar_subquery()
+            top_5_stmt = select(Country, total_stmt).order_by(Country.estimated_gdp.desc()).limit(5)
             cache_stmt = select(SummaryCache) # Assuming fixed ID=1
 
-            # Execute all three DB calls concurrently (Huge speed gain here!)
-            (count_result, top_5_result, cache_result) = await asyncio.gather(
-                session.execute(count_stmt),
-                session.execute(top_5_stmt),
-                session.execute(cache_stmt),
-            )
-            
-            # Process results
-            total_count = count_result.scalar_one()
-            top_5 = top_5_result.scalars().all()
-            existing_cache = cache_result.scalars().first()
-            # stmt = select(Country).order_by(Country.estimated_gdp.desc())
-            # result = await session.execute(stmt)
-            # countries = result.scalars().all()
-            # stmt2 = select(func.count()).select_from(Country)
-            # result2 = await session.execute(stmt2)
-            # total_count = result2.scalar_one()
-            # top_5 = countries[:5]
-
-            # # 1. Get Top 5 by Estimated GDP (Same logic as before)
-            # sorted_countries = sorted(
-            #     countries, 
-            #     key=lambda x: x.get("estimated_gdp") if x.get("estimated_gdp") is not None else -1, 
-            #     reverse=True
-            # )
-            # top_5 = sorted_countries[:5]
+            top_5_rows = (await session.execute(top_5_stmt)).all()
+            existing_cache = (await session.execute(cache_stmt)).scalars().first()
+
+            # Process results (an empty table returns no rows, hence no count)
+            total_count = top_5_rows[0][1] if top_5_rows else 0
+            top_5 = [row[0] for row in top_5_rows]
             
             # 2. Format content for drawing (Text Summary)
             summary_text = f"--- Country Data Refresh Summary ---\n"
             summary_text += f"Total number of countries: {total_count}\n"
-            summary_text += f"Timestamp of last refresh: {refresh_time.strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
+            summary_text += f"Timestamp of last refresh: {truncate_timestamp(refresh_time).strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
             summary_text += "Top 5 Countries by Estimated GDP:\n"
             
             for i, country in enumerate(top_5):
@@ -67,48 +65,51 @@ async def generate_summary_image_data(refresh_time, session):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"error": "Summary image not found in 1"})
         try:
-            # 3. Generate the PNG binary data in memory using BytesIO
-        
-            img_width, img_height = 800, 400
-            img = Image.new('RGB', (img_width, img_height), color=(255, 255, 255))
-            draw = ImageDraw.Draw(img)
-            
-            # NOTE: Ensure you handle font loading safely in a production environment
-            font = ImageFont.load_default() 
+            # 3. Generate the PNG off the event loop, or reuse the last one if the inputs are unchanged
+            async def load_previous_image():
+                return await session.scalar(
+                    select(SummaryImage.image_data).where(SummaryImage.image_hash == existing_cache.image_hash)
+                )
 
-            draw.text((10, 10), summary_text, fill=(0, 0, 0), font=font)
-            
-            # Create an in-memory binary stream
-            img_byte_arr = BytesIO()
-            # Save the image content (PNG format) to the stream
-            img.save(img_byte_arr, format='PNG') 
-            
-            # Get the binary data (bytes) from the stream
-            image_data_bytes = img_byte_arr.getvalue() 
+            image_data_bytes, image_hash, render_seconds = await render_summary_image(
+                summary_text,
+                existing_cache.summary_text if existing_cache else None,
+                load_previous_image if existing_cache and existing_cache.image_hash else None,
+            )
         except Exception:
             raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"error": "Summary image not found in 2"})
         try:
+            # Store the PNG content-addressed and drop superseded renders
+            image_digest_value = image_digest(image_data_bytes)
+            if await session.get(SummaryImage, image_digest_value) is None:
+                session.add(SummaryImage(image_hash=image_digest_value, image_data=image_data_bytes))
+            await session.execute(delete(SummaryImage).where(SummaryImage.image_hash != image_digest_value))
+
             new_cache =  {
-                "summary_image_data": image_data_bytes,
+                "image_hash": image_digest_value,
+                "total_countries": total_count,
                 "summary_text": summary_text,
-                "filename": "cache/summary.png"
+                "filename": "cache/summary.png",
+                "last_refreshed_at": refresh_time
             }
 
-            # stmt = select(SummaryCache)
-            # result = await session.execute(stmt)
-            # existing_cache = result.scalars().first()
-
             if existing_cache:
                 for key, value in new_cache.items():
                         setattr(existing_cache, key, value)
                 session.add(existing_cache)
             else:
-                create_cache = SummaryCache(**new_cache)
+                # The shared generation continues from this process's counter
+                create_cache = SummaryCache(**new_cache, data_generation=current_generation())
                 session.add(create_cache)
 
-            return {"total_count": total_count}
+            return {
+                "total_count": total_count,
+                "image_hash": image_hash,
+                "image_data": image_data_bytes,
+                "render_ms": round(render_seconds * 1000, 3)
+            }
         except Exception:
             raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -122,96 +123,162 @@ async def generate_summary_image_data(refresh_time, session):
     
 
 
-async def fetch_external_url(session):
+def _not_modified_result():
+    return {
+        "message": "Upstream data not modified; refresh skipped.",
+        "status": "not_modified",
+        "valid_countries_updated": 0,
+        "valid_countries_inserted": 0,
+        "valid_countries_unchanged": 0,
+        "duplicate_countries_skipped": 0,
+        "countries_deleted": 0,
+        "countries_delete_skipped": 0,
+        "field_changes": {},
+        "invalid_countries_skipped": 0,
+        "errors": [],
+        "summary_render_ms": 0.0,
+        "data_generation": current_generation(),
+        "last_refreshed_at": None
+    }
+
+async def fetch_external_url(session, force=False, timings=None):
+    stages = StageTimer(timings)
+    source = None
     try:
-        processed_countries = await fetch_and_process_country_data()
-        inserted_count = 0
-        updated_count = 0
+        with stages.stage("fetch"):
+            # Conditional requests use the validators of the last refresh applied by any worker
+            adopt_upstream_validators(await load_upstream_validators(session))
+            source = await open_country_stream(force=force)
+
+        # 1. Both upstream sources unchanged: skip the DB writes and the image render
+        if source is None:
+            return _not_modified_result()
+
+        # 2. Parse, process, diff and write the countries batch by batch as they
+        # stream in, so peak memory follows the batch size, not the payload size.
+        # Processing batches are large enough for the columnar GDP path; the
+        # diff and writes go in REFRESH_BATCH_SIZE chunks
+        refreshed_at = datetime.utcnow()
+        rng = gdp_rng()
         invalid_countries = []
+        totals = {"inserted": 0, "updated": 0, "unchanged": 0, "duplicates": 0}
+        field_changes = {field: 0 for field in DIFF_FIELDS}
+        tracking_names = False
+
+        batches = source.batches(processing_batch_size(REFRESH_BATCH_SIZE))
+        while True:
+            with stages.stage("fetch"):
+                batch = await anext(batches, None)
+            if batch is None:
+                break
+            # Names seen across batches (created on the first batch: a no-op refresh sends nothing)
+            if not tracking_names:
+                with stages.stage("diff"):
+                    await reset_seen_names(session)
+                tracking_names = True
+            # Business rules and validation in a worker thread, off the event loop
+            with stages.stage("validate"):
+                valid_countries, invalid = await asyncio.to_thread(
+                    process_country_payload, batch, source.exchange_rates, rng=rng)
+                invalid_countries.extend(invalid)
+
+            for start in range(0, len(valid_countries), REFRESH_BATCH_SIZE):
+                chunk = valid_countries[start:start + REFRESH_BATCH_SIZE]
+                # Diff against the stored rows of this chunk, then write only real inserts/changes
+                with stages.stage("diff"):
+                    diff = await diff_country_batch(session, chunk)
+                with stages.stage("write"):
+                    upsert_result = await upsert_countries(session, diff["inserts"] + diff["updates"], refreshed_at)
+                totals["inserted"] += upsert_result["inserted"]
+                totals["updated"] += upsert_result["updated"]
+                totals["unchanged"] += diff["unchanged"]
+                totals["duplicates"] += diff["duplicates"]
+                for field, count in diff["field_changes"].items():
+                    field_changes[field] += count
+
+        # 3. Countries body identical to the last applied one (hash) and rates unchanged.
+        # The stream yielded nothing, so no write was sent; keep fresh validators
+        # (e.g. a new ETag) so the next refresh can get a 304
+        if not source.changed:
+            await session.rollback()
+            if upstream_validators_changed():
+                await save_upstream_validators(session, upstream_validators_to_apply())
+                await session.commit()
+            commit_upstream_validators()
+            return _not_modified_result()
+
+        # Stored countries missing upstream are deleted (anti-join against the
+        # seen names), unless the payload looks truncated: no valid country at
+        # all, or too large a share of the table
+        deleted_count, skipped_deletes = 0, 0
+        if REFRESH_DELETE_MISSING:
+            seen_count = totals["inserted"] + totals["updated"] + totals["unchanged"]
+            with stages.stage("diff"):
+                if not tracking_names:
+                    await reset_seen_names(session)
+                missing_count, stored_count = await count_missing_countries(session)
+            if missing_count and (not seen_count or missing_count > REFRESH_DELETE_MAX_FRACTION * stored_count):
+                print(f"Refresh: not deleting {missing_count} of {stored_count} stored countries missing upstream "
+                      f"(REFRESH_DELETE_MAX_FRACTION={REFRESH_DELETE_MAX_FRACTION})")
+                skipped_deletes = missing_count
+            elif missing_count:
+                with stages.stage("write"):
+                    deleted_count = await delete_missing_countries(session)
 
-        countries_to_stage = []
-        #countries_for_summary = [] # List to hold data for image generation
-        for country_data in processed_countries:
-            # --- CUSTOM VALIDATION STEP ---
-            validation_errors = {}
-            
-            validation_errors = {}
-            if not country_data.get("name"):
-                validation_errors["name"] = "is required"
-            if country_data.get("population") is None:
-                validation_errors["population"] = "is required"
-            if country_data.get("currency_code") is None:
-                # This catches Antarctica and other countries missing currency codes
-                validation_errors["currency_code"] = "is required (Missing currency code from external API)"
-            
-            if validation_errors:
-                invalid_countries.append({
-                    "error": "Validation failed",
-                    "details": validation_errors,
-                    "name": country_data.get("name", "Unknown Country"),
-                })
-                continue # Skip invalid record
-            
-            # Normalize name for lookup (using your model's logic)
-            country_name_normalized = country_data["name"].strip().title()
-
-            # Check if country exists (case-insensitive)
-            statement = select(Country).where(Country.name == country_name_normalized)
-            result = await session.execute(statement)
-            existing_country = result.scalars().first()
-            
-
-            # Prepare new data for Country object creation/update
-            new_data_for_model = {
-                k: v for k, v in country_data.items() 
-                if k in Country.__fields__ # I don't have id fields comming in
-            }
-            new_data_for_model["last_refreshed_at"] = datetime.utcnow()
-            
-            if existing_country:
-                # 2. UPDATE existing record
-                for key, value in new_data_for_model.items():
-                    setattr(existing_country, key, value)
-                
-                # SQLModel adds the object back to the session for tracking changes
-                countries_to_stage.append(existing_country)
-                #session.add(existing_country)
-                updated_count += 1
-                
-                # Append the updated object data for the summary image
-                #countries_for_summary.append(existing_country.dict())
-            else:
-                # 3. INSERT new record
-                new_country = Country(**new_data_for_model)
-                countries_to_stage.append(new_country)
-                #session.add(new_country)
-                inserted_count += 1
-                
-                # Append the new object data for the summary image
-                #countries_for_summary.append(new_country.model_dump())
-
-        # 2. Bulk Stage all Country objects (Faster than sequential session.add calls)
-        session.add_all(countries_to_stage)
-
-
-        # 4. Update global timestamp and generate image
         LAST_REFRESHED_TIMESTAMP = datetime.utcnow()
 
-        process = await generate_summary_image_data(
-            LAST_REFRESHED_TIMESTAMP,
-            session
-        )
+        # 4. Nothing inserted, updated or deleted: the aggregates, the summary
+        # image and the generation still hold, so every worker keeps its caches.
+        # Only the refresh time and the new validators are stored
+        stamped = False
+        if not (totals["inserted"] or totals["updated"] or deleted_count):
+            with stages.stage("commit"):
+                await drop_seen_names(session)
+                stamped = await stamp_unchanged_refresh(
+                    session, LAST_REFRESHED_TIMESTAMP, upstream_validators_to_apply())
+                if stamped:
+                    await session.commit()
+
+        if stamped:
+            commit_upstream_validators()
+            generation = current_generation()
+            render_ms = 0.0
+        else:
+            # Per-region / per-currency rollups, in the same transaction as the rows
+            with stages.stage("aggregate"):
+                await rebuild_aggregates(session, refreshed_at)
+
+            # 5. Generate the summary image
+            with stages.stage("summary"):
+                process = await generate_summary_image_data(
+                    LAST_REFRESHED_TIMESTAMP,
+                    session
+                )
 
-        # 5. Commit all changes
-        await session.commit()
+            # 6. Commit all changes, with the new shared generation and validators
+            with stages.stage("commit"):
+                await drop_seen_names(session)
+                shared_generation = await bump_shared_generation(session, upstream_validators=upstream_validators_to_apply())
+                await session.commit()
+            commit_upstream_validators()
+            generation = bump_generation(shared_generation)
+            publish_image(process["image_data"])
+            render_ms = process["render_ms"]
 
         return {
             "message": "Country data refresh complete.",
             "status": "success",
-            "valid_countries_updated": updated_count,
-            "valid_countries_inserted": inserted_count,
+            "valid_countries_updated": totals["updated"],
+            "valid_countries_inserted": totals["inserted"],
+            "valid_countries_unchanged": totals["unchanged"],
+            "duplicate_countries_skipped": totals["duplicates"],
+            "countries_deleted": deleted_count,
+            "countries_delete_skipped": skipped_deletes,
+            "field_changes": field_changes,
             "invalid_countries_skipped": len(invalid_countries),
             "errors": invalid_countries, # Return the list of skipped countries and their errors
+            "summary_render_ms": render_ms,
+            "data_generation": generation,
             "last_refreshed_at": LAST_REFRESHED_TIMESTAMP.isoformat()
         }
     except HTTPException:
@@ -223,27 +290,33 @@ async def fetch_external_url(session):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    finally:
+        if source is not None:
+            await source.aclose()
+        stages.flush()
 
-async def get_image(session):
+async def get_image(session, if_none_match=None):
     try:
-            # 1. Query the single summary cache record (ID=1)
-            # Assuming the SummaryCache record has a fixed ID (e.g., 1)
-            stmt = select(SummaryCache)
-            result = await session.execute(stmt)
-            summary_cache = result.scalars().first()
-
-            if not summary_cache or not summary_cache.summary_image_data:
-                # 2. Return 404 if no record exists or if the data field is empty/null
+            # 1. Serve from the content-addressed cache (ETag / 304 aware),
+            # unless another worker has published a newer render
+            await sync_shared_state(session)
+            response = image_response(if_none_match)
+            if response is not None:
+                return response
+
+            # 2. Cold start: read the BLOB from the database once and populate the cache
+            stmt = select(SummaryImage.image_data).join(SummaryCache, SummaryCache.image_hash == SummaryImage.image_hash)
+            image_data = await session.scalar(stmt)
+
+            if not image_data:
+                # Return 404 if no record exists or if the data field is empty/null
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail={ "error": "Summary image not found. Run /countries/refresh first." }
                 )
             
-            # 3. Serve the binary data from the database
-            return Response(
-                content=summary_cache.summary_image_data, 
-                media_type="image/png" # Crucial for the browser to display the PNG correctly
-            )
+            publish_image(image_data)
+            return image_response(if_none_match)
 
     except HTTPException as e:
         # Re-raise 404 or other expected HTTP errors
@@ -267,12 +340,21 @@ async def delete_country(name, session):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail={ "error": "Country not found" }
             )
+        affected_keys = {"region": [country_to_delete.region], "currency": [country_to_delete.currency_code]}
         #delete session
         await session.delete(country_to_delete)
+        await session.flush()
+        # 3. Recompute the region and currency rollups the country belonged to
+        await rebuild_aggregates(session, datetime.utcnow(), keys=affected_keys)
+        # New shared generation; forget the upstream validators so the next
+        # refresh is not skipped as "not modified", or the row would stay gone
+        shared_generation = await bump_shared_generation(session, upstream_validators=None)
         # Commit the deletion
         await session.commit() 
-        # 4. Return 204 No Content on success (FastAPI handles the response body correctly)
-        return
+        generation = bump_generation(shared_generation)
+        reset_upstream_validators()
+        # 4. Return the new data generation (consistency token for reads; the router sends 204)
+        return generation
     except HTTPException:
         # Re-raise 404 immediately
         await session.rollback()
@@ -286,25 +368,85 @@ async def delete_country(name, session):
             detail={ "error": "Internal server error" }
         )
 
+async def delete_countries(session, names=None, region=None, currency=None):
+    """
+    Bulk variant of delete_country: deletes the given names (normalized the
+    same way) or every country matching the region/currency filter with
+    set-based DELETEs in one transaction, rebuilds the affected aggregates
+    and invalidates the read caches once. Returns the per-name results.
+    """
+    try:
+        # 1. Select what will be deleted (locking the rows): per-name results
+        # and the region/currency rollups to rebuild come from this
+        columns = (Country.name, Country.region, Country.currency_code)
+        if names is not None:
+            requested = {}
+            for name in names:
+                requested.setdefault(name.strip().title(), name)
+            stmt = select(*columns).where(Country.name.in_(list(requested)))
+        else:
+            normalized_region, normalized_currency, _ = normalize_country_filters(region, currency, None)
+            stmt = select(*columns).where(country_filters(normalized_region, normalized_currency))
+        rows = (await session.execute(stmt.with_for_update())).all()
+
+        if not rows:
+            await session.rollback()
+            results = [{"name": original, "status": "not_found"} for original in requested.values()] if names is not None else []
+            return {"deleted": 0, "data_generation": current_generation(), "results": results}
+
+        # 2. Set-based DELETE: by name (batched IN lists) or with the filter itself
+        if names is not None:
+            deleted_count = await delete_countries_by_name(session, [row.name for row in rows])
+        else:
+            result = await session.execute(delete(Country).where(country_filters(normalized_region, normalized_currency)))
+            deleted_count = result.rowcount
+
+        # 3. Recompute the rollups of every region and currency that lost a country
+        await rebuild_aggregates(session, datetime.utcnow(), keys={
+            "region": {row.region for row in rows},
+            "currency": {row.currency_code for row in rows},
+        })
+
+        # 4. One cache invalidation for the whole batch; the next refresh must
+        # not be skipped as "not modified", or the rows would stay gone
+        shared_generation = await bump_shared_generation(session, upstream_validators=None)
+        await session.commit()
+        generation = bump_generation(shared_generation)
+        reset_upstream_validators()
+
+        if names is not None:
+            deleted = {row.name for row in rows}
+            results = [
+                {"name": original, "status": "deleted" if name in deleted else "not_found"}
+                for name, original in requested.items()
+            ]
+        else:
+            results = [{"name": row.name, "status": "deleted"} for row in rows]
+        return {"deleted": deleted_count, "data_generation": generation, "results": results}
+    except HTTPException:
+        await session.rollback()
+        raise
+    except Exception as e:
+        await session.rollback()
+        print(f"Error bulk deleting countries: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+
+@coalesce
 async def status_fetch(session):
     try:
-        # 1. Define Concurrent Queries
-        # Get total count of countries
+        # 1. Count and last refresh timestamp (metadata column only, no text/BLOB)
+        # merged into a single SELECT: one round trip on one connection
         count_stmt = select(func.count(Country.name)).select_from(Country)
-        # Get last refresh timestamp from cache (assuming ID=1)
-        cache_stmt = select(SummaryCache)
+        cache_stmt = select(SummaryCache.last_refreshed_at)
 
-        # 2. Execute concurrently to save time
-        (count_result, cache_result) = await asyncio.gather(
-            session.execute(count_stmt),
-            session.execute(cache_stmt),
-        )
-
-        total_countries = count_result.scalar_one_or_none()
-        summary_cache = cache_result.scalars().first()
+        # 2. Execute
+        total_countries, last_refreshed_at = (await session.execute(merge_scalar_selects(count_stmt, cache_stmt))).one()
 
         # 3. Handle 404 if data hasn't been cached (i.e., refresh never ran)
-        if summary_cache is None or total_countries is None or total_countries == 0:
+        if last_refreshed_at is None or total_countries is None or total_countries == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail={ "error": "Country not found" }
@@ -313,7 +455,7 @@ async def status_fetch(session):
         # 4. Format and return the required response
         return ResStatus(
             total_countries = total_countries,
-            last_refreshed_at =  summary_cache.last_refreshed_at.isoformat()
+            last_refreshed_at =  last_refreshed_at.isoformat()
         )
 
     except HTTPException:
@@ -326,6 +468,7 @@ async def status_fetch(session):
             detail={ "error": "Internal server error" }
         )
 
+@coalesce
 async def named_country(filt_name, session):
     try:
         name = filt_name.strip()
@@ -365,41 +508,123 @@ async def named_country(filt_name, session):
             detail={ "error": "Internal server error" }
         )
     
-async def db_country(region, currency, sort, session):
+async def named_countries(names, session):
+    """
+    Batch variant of named_country: resolves all names (normalized the same
+    way) with one IN query on the unique name index. Returns the found
+    countries in request order and the names that matched nothing;
+    duplicates (after normalization) are looked up once.
+    """
     try:
-        # Build dynamic filters
-        filters = []
-        
-        if region is not None:
-            normalized_region = region.strip().title()
-            filters.append(Country.region == normalized_region)   
-        if currency is not None:
-            normalized_currency = currency.strip().upper()
-            filters.append(Country.currency_code == normalized_currency)
+        # 1. Normalize and de-duplicate, keeping the first spelling of each name
+        requested = {}
+        for name in names:
+            requested.setdefault(name.strip().title(), name)
 
-        
-        stmt = select(Country).where(and_(*filters) if filters else True)
-
-        if sort is not None:
-            sort_lower = sort.strip().lower()
-            if sort_lower == 'gdp_desc':
-                stmt = stmt.order_by(Country.estimated_gdp.desc())
-            elif sort_lower == 'gdp_asc':
-                stmt = stmt.order_by(Country.estimated_gdp.asc())
-            
-        # 3. Execute Query
+        # 2. One query for the whole batch
+        stmt = select(*count_columns()).where(Country.name.in_(list(requested)))
         result = await session.execute(stmt)
-        countries = result.scalars().all()
+        found = {row.name: dict(zip(COUNT_FIELDS, row)) for row in result.all()}
+
+        # 3. Split into found / not found, in request order
+        return {
+            "countries": [found[name] for name in requested if name in found],
+            "not_found": [original for name, original in requested.items() if name not in found],
+        }
+    except Exception as e:
+        print(f"Error retrieving country batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+
+
+def normalize_country_filters(region, currency, sort):
+    """Normalizes the /countries query parameters into a hashable cache key."""
+    normalized_region = region.strip().title() if region is not None else None
+    normalized_currency = currency.strip().upper() if currency is not None else None
+    sort_lower = sort.strip().lower() if sort is not None else None
+    if sort_lower not in ('gdp_desc', 'gdp_asc'):
+        sort_lower = None
+    return (normalized_region, normalized_currency, sort_lower)
+
+def country_filters(normalized_region, normalized_currency):
+    """WHERE clause for the normalized region/currency filters."""
+    filters = []
+    
+    if normalized_region is not None:
+        filters.append(Country.region == normalized_region)   
+    if normalized_currency is not None:
+        filters.append(Country.currency_code == normalized_currency)
+
+    return and_(*filters) if filters else True
+
+def order_countries(stmt, sort_lower):
+    """Applies the optional GDP sort."""
+    if sort_lower == 'gdp_desc':
+        stmt = stmt.order_by(Country.estimated_gdp.desc())
+    elif sort_lower == 'gdp_asc':
+        stmt = stmt.order_by(Country.estimated_gdp.asc())
+    return stmt
+
+# Fields of the Count response schema, in its order. Rows selected as these
+# columns are already valid Count objects, so the encoded path skips the
+# per-row ORM load and response_model validation.
+COUNT_FIELDS = tuple(Count.model_fields)
+
+
+def count_columns():
+    """Country columns matching the Count response schema, in field order."""
+    return [Country.__table__.c[field] for field in COUNT_FIELDS]
+
+
+def encode_count_rows(rows) -> EncodedBody:
+    """JSON array of Count objects from rows selected with count_columns()."""
+    return EncodedBody(dumps_bytes([dict(zip(COUNT_FIELDS, row)) for row in rows]))
+
+
+@coalesce
+async def db_country(region, currency, sort, session, encoded=False):
+    """
+    Filtered, sorted country list. With encoded=True returns the JSON body as
+    an EncodedBody (cached per data generation, with its compressed variants)
+    instead of a list of dicts.
+    """
+    try:
+        key = normalize_country_filters(region, currency, sort)
+        normalized_region, normalized_currency, sort_lower = key
+        cache_key = key + ("json",) if encoded else key
+
+        # 1. Serve from the read cache if the data generation hasn't changed
+        # (here or, checked every STATE_SYNC_INTERVAL_SECONDS, in another worker)
+        await sync_shared_state(session)
+        countries = countries_cache.get(cache_key)
+        if countries is None:
+            generation = current_generation()
+
+            # 2. Build dynamic filters
+            columns = count_columns() if encoded else [Country]
+            stmt = select(*columns).where(country_filters(normalized_region, normalized_currency))
+
+            stmt = order_countries(stmt, sort_lower)
+                
+            # 3. Execute Query and cache plain dicts (or the encoded body) tagged with the generation read under
+            result = await session.execute(stmt)
+            if encoded:
+                countries = encode_count_rows(result.all())
+            else:
+                countries = [country.model_dump() for country in result.scalars().all()]
+            countries_cache.set(cache_key, countries, generation, from_replica=session.info.get("replica", False))
         
         # 4. Handle Empty Results for Filtered Queries
         # If no results and filters were applied, return 404 as requested
-        if not countries:
+        if not countries or (encoded and countries.body == b"[]"):
              raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail={ "error": "Country not found" }
             )
         
-        # 5. Return the list of Country model instances (can be empty if no filters applied)
+        # 5. Return the list of country records
         return countries
     except HTTPException:
         raise
@@ -408,3 +633,102 @@ async def db_country(region, currency, sort, session):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={ "error": "Internal server error", "detail": str(e)}
         )
+
+async def db_country_page(region, currency, sort, limit, cursor, session, encoded=False):
+    """
+    Keyset-paginated variant of db_country. Returns (countries, next_cursor);
+    next_cursor is None on the last page. With encoded=True countries is an
+    EncodedBody.
+    """
+    try:
+        normalized_region, normalized_currency, sort_lower = normalize_country_filters(region, currency, sort)
+        decoded_cursor = decode_cursor(cursor, sort_lower) if cursor else None
+
+        key = (normalized_region, normalized_currency, sort_lower, limit, cursor, "json" if encoded else None)
+        await sync_shared_state(session)
+        page = countries_cache.get(key)
+        if page is None:
+            generation = current_generation()
+
+            # 1. Seek past the previous page and read one extra row to detect the end
+            columns = count_columns() if encoded else [Country]
+            if sort_lower is not None:
+                columns.append(gdp_sort_key())
+            stmt = select(*columns).where(country_filters(normalized_region, normalized_currency))
+            stmt = apply_keyset(stmt, sort_lower, decoded_cursor).limit(limit + 1)
+            result = await session.execute(stmt)
+            rows = result.all()
+
+            # 2. Build the next cursor from the last row actually returned
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                if encoded:
+                    next_cursor = cursor_for_row(sort_lower, last, last[-1] if sort_lower else None)
+                else:
+                    next_cursor = cursor_for_row(sort_lower, last[0], last[1] if sort_lower else None)
+
+            if encoded:
+                page = (encode_count_rows(row[:len(COUNT_FIELDS)] for row in rows), next_cursor)
+            else:
+                page = ([row[0].model_dump() for row in rows], next_cursor)
+            countries_cache.set(key, page, generation, from_replica=session.info.get("replica", False))
+
+        # 3. An empty first page means nothing matched the filters
+        if (not page[0] or (encoded and page[0].body == b"[]")) and cursor is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={ "error": "Country not found" }
+            )
+        return page
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error", "detail": str(e)}
+        )
+
+async def stream_countries(region, currency, sort, session):
+    """
+    Streams the filtered country table as NDJSON from a server-side cursor.
+    Rows are read as plain column tuples (no ORM identity map) in chunks of
+    STREAM_CHUNK_ROWS, so memory stays flat regardless of table size.
+
+    The body is produced after the endpoint has returned, so the session must
+    stay open until the response is sent (get_read_db's does). Raises 404
+    before streaming starts if nothing matches.
+    """
+    normalized_region, normalized_currency, sort_lower = normalize_country_filters(region, currency, sort)
+    stmt = select(*count_columns()).where(country_filters(normalized_region, normalized_currency))
+    stmt = order_countries(stmt, sort_lower)
+
+    try:
+        result = await session.stream(stmt)
+        first_chunk = await result.fetchmany(STREAM_CHUNK_ROWS)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error", "detail": str(e)}
+        )
+
+    if not first_chunk:
+        await result.close()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={ "error": "Country not found" }
+        )
+
+    def encode(rows):
+        return dumps_lines(dict(zip(COUNT_FIELDS, row)) for row in rows)
+
+    async def body():
+        try:
+            yield encode(first_chunk)
+            async for chunk in result.partitions(STREAM_CHUNK_ROWS):
+                yield encode(chunk)
+        finally:
+            await result.close()
+
+    return body()
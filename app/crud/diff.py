@@ -0,0 +1,151 @@
+import math
+from typing import List, Dict, Any, Tuple
+from sqlmodel import select, func
+from sqlalchemy import Column, MetaData, String, Table, case, delete, exists, insert, text
+from sqlalchemy.schema import CreateTable
+from ..model.country_table import Country
+from .upsert import normalize_country_record
+
+# Source fields compared against the stored row. estimated_gdp is derived
+# (population x random factor / rate), so it is rewritten only when one of
+# these changes; otherwise the fresh random factor alone would mark every row dirty.
+DIFF_FIELDS = ("capital", "region", "population", "currency_code", "exchange_rate", "flag")
+
+# Country.exchange_rate is a single-precision FLOAT on MySQL, so stored
+# values only round-trip to ~7 significant digits.
+FLOAT_REL_TOL = 1e-6
+
+# Names already diffed by the running refresh. Kept in a temporary table on the
+# refresh's connection rather than in a Python set, so a name repeated in a
+# later batch is recognized, and stored countries missing from the payload are
+# found with an anti-join, without holding every name in memory.
+# Not part of SQLModel.metadata: create_all and migrations never see it.
+seen_names_table = Table(
+    "refresh_seen_name", MetaData(),
+    Column("name", String(100), primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _values_differ(old: Any, new: Any) -> bool:
+    """Compares a stored value with an incoming one, tolerating FLOAT rounding."""
+    if isinstance(old, float) and isinstance(new, (int, float)) and old is not None:
+        return not math.isclose(old, new, rel_tol=FLOAT_REL_TOL)
+    return old != new
+
+
+async def drop_seen_names(session) -> None:
+    """Drops the temporary table of seen names, if this connection has one."""
+    # TEMPORARY: a plain DROP TABLE would commit the open transaction on MySQL
+    keyword = "TEMPORARY " if session.get_bind().dialect.name == "mysql" else ""
+    await session.execute(text(f"DROP {keyword}TABLE IF EXISTS {seen_names_table.name}"))
+
+
+async def reset_seen_names(session) -> None:
+    """Starts a refresh with an empty temporary table of seen names."""
+    await drop_seen_names(session)
+    await session.execute(CreateTable(seen_names_table))
+
+
+def _normalize_incoming(records: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """Normalizes records and deduplicates on name (first one wins). Returns the rows and the duplicate count."""
+    incoming: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        row = normalize_country_record(record)
+        incoming.setdefault(row["name"], row)
+    return incoming, len(records) - len(incoming)
+
+
+def _compare(incoming: Dict[str, Dict[str, Any]], stored: Dict[str, Any]) -> Dict[str, Any]:
+    """Splits incoming rows into inserts, updates (with stored id) and unchanged."""
+    inserts = []
+    updates = []
+    field_changes = {field: 0 for field in DIFF_FIELDS}
+    unchanged = 0
+
+    for name, row in incoming.items():
+        existing = stored.get(name)
+        if existing is None:
+            inserts.append(row)
+            continue
+
+        changed = [field for field in DIFF_FIELDS if _values_differ(getattr(existing, field), row[field])]
+        if not changed:
+            unchanged += 1
+            continue
+
+        for field in changed:
+            field_changes[field] += 1
+        updates.append({"id": existing.id, **row})
+
+    return {
+        "inserts": inserts,
+        "updates": updates,
+        "field_changes": field_changes,
+        "unchanged": unchanged,
+    }
+
+
+def _diff_columns():
+    return [Country.id, Country.name] + [getattr(Country, field) for field in DIFF_FIELDS]
+
+
+async def diff_country_batch(session, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compares one batch of a streamed payload with the stored rows of the same
+    names (one SELECT ... WHERE name IN) and returns only the real changes:
+
+    - "inserts": rows for names not yet stored
+    - "updates": changed rows, carrying their stored id
+    - "field_changes": per-field count of changed values
+    - "unchanged": number of rows left untouched
+    - "duplicates": records dropped because their name came earlier in the
+      payload (in this batch or an earlier one: the first occurrence wins)
+
+    Deletions are left to delete_missing_countries once the whole payload is seen.
+
+    Call reset_seen_names first; the batch's names are added to it.
+    """
+    incoming, duplicates = _normalize_incoming(records)
+
+    # Stored rows of the batch, flagged when an earlier batch already had the name
+    stmt = (
+        select(*_diff_columns(), seen_names_table.c.name.label("seen"))
+        .select_from(Country)
+        .outerjoin(seen_names_table, seen_names_table.c.name == Country.name)
+        .where(Country.name.in_(list(incoming)))
+    )
+    stored = {}
+    for row in (await session.execute(stmt)).all():
+        if row.seen is not None:
+            del incoming[row.name]
+            duplicates += 1
+        else:
+            stored[row.name] = row
+    if incoming:
+        await session.execute(insert(seen_names_table), [{"name": name} for name in incoming])
+
+    diff = _compare(incoming, stored)
+    diff["duplicates"] = duplicates
+    return diff
+
+
+def _missing_upstream():
+    """Condition on Country: the name is not in the seen names of this refresh."""
+    return ~exists().where(seen_names_table.c.name == Country.name)
+
+
+async def count_missing_countries(session) -> Tuple[int, int]:
+    """
+    Number of stored countries the (fully streamed) payload did not contain,
+    and of all stored countries, in one SELECT.
+    """
+    missing = func.coalesce(func.sum(case((_missing_upstream(), 1), else_=0)), 0)
+    row = (await session.execute(select(missing, func.count(Country.id)))).one()
+    return int(row[0]), row[1]
+
+
+async def delete_missing_countries(session) -> int:
+    """Deletes the stored countries the payload did not contain (one set-based DELETE)."""
+    result = await session.execute(delete(Country).where(_missing_upstream()))
+    return result.rowcount
@@ -0,0 +1,229 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+from fastapi import HTTPException
+from sqlmodel import select
+from sqlalchemy import text, delete
+from ..databasesetup import engine, async_session
+from ..model.country_table import RefreshJob
+from ..sec import REFRESH_INTERVAL_SECONDS, REFRESH_LOCK_NAME, REFRESH_JOB_HISTORY
+from .country import fetch_external_url
+
+# Refresh jobs run in the background of the worker that accepted them.
+# Single-flight is enforced twice: an asyncio.Lock within the process, and on
+# MySQL a named GET_LOCK held on a dedicated connection for the whole job, so
+# only one worker refreshes at a time. Other dialects rely on the process lock.
+# Each status change is also written to the refreshjob table, so any worker
+# can report on a job; the last REFRESH_JOB_HISTORY jobs are kept there.
+
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_process_lock = asyncio.Lock()
+_tasks: set = set()
+_scheduler_task: Optional[asyncio.Task] = None
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _job_from_row(row: RefreshJob) -> Dict[str, Any]:
+    return {
+        "job_id": row.job_id,
+        "status": row.status,
+        "trigger": row.trigger,
+        "force": row.force,
+        "created_at": row.created_at.isoformat(),
+        "started_at": row.started_at.isoformat() if row.started_at else None,
+        "finished_at": row.finished_at.isoformat() if row.finished_at else None,
+        "stage_timings_ms": row.stage_timings_ms,
+        "result": row.result,
+        "error": row.error,
+    }
+
+
+async def _save_job(job: Dict[str, Any]) -> None:
+    """
+    Writes the job record to the refreshjob table and, once it has finished,
+    drops rows beyond the history. Best effort: the job runs either way.
+    """
+    try:
+        async with async_session() as session:
+            await session.merge(RefreshJob(
+                job_id=job["job_id"],
+                status=job["status"],
+                trigger=job["trigger"],
+                force=job["force"],
+                created_at=_parse_time(job["created_at"]),
+                started_at=_parse_time(job["started_at"]),
+                finished_at=_parse_time(job["finished_at"]),
+                stage_timings_ms=job["stage_timings_ms"],
+                result=job["result"],
+                error=job["error"],
+            ))
+            if job["finished_at"]:
+                cutoff = await session.scalar(
+                    select(RefreshJob.created_at).order_by(RefreshJob.created_at.desc())
+                    .offset(REFRESH_JOB_HISTORY - 1).limit(1)
+                )
+                if cutoff is not None:
+                    await session.execute(delete(RefreshJob).where(RefreshJob.created_at < cutoff))
+            await session.commit()
+    except Exception as e:
+        print(f"Could not save refresh job {job['job_id']}: {e}")
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the job record: this worker's own jobs from memory, others from
+    the refreshjob table. None if unknown (or aged out of the history).
+    """
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    async with async_session() as session:
+        row = await session.get(RefreshJob, job_id)
+    return _job_from_row(row) if row is not None else None
+
+
+def _new_job(trigger: str, force: bool) -> Dict[str, Any]:
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "status": "queued",
+        "trigger": trigger,
+        "force": force,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "stage_timings_ms": {},
+        "result": None,
+        "error": None,
+    }
+    _jobs[job["job_id"]] = job
+    while len(_jobs) > REFRESH_JOB_HISTORY:
+        _jobs.popitem(last=False)
+    return job
+
+
+async def _find_running_job() -> Optional[Dict[str, Any]]:
+    """The newest job recorded as running by any worker, or None."""
+    async with async_session() as session:
+        row = await session.scalar(
+            select(RefreshJob).where(RefreshJob.status == "running").order_by(RefreshJob.created_at.desc()).limit(1)
+        )
+    return _job_from_row(row) if row is not None else None
+
+
+async def _acquire_db_lock(conn) -> bool:
+    """Cross-worker lock. Non-blocking: returns False if another worker holds it."""
+    if conn is None:
+        return True
+    result = await conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": REFRESH_LOCK_NAME})
+    return result.scalar() == 1
+
+
+async def _release_db_lock(conn) -> None:
+    if conn is not None:
+        await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": REFRESH_LOCK_NAME})
+
+
+async def _run_job(job: Dict[str, Any]) -> None:
+    """Runs one refresh job under the process and database locks."""
+    await _save_job(job)
+    async with _process_lock:
+        conn = None
+        try:
+            if engine.dialect.name == "mysql":
+                conn = await engine.connect()
+            if not await _acquire_db_lock(conn):
+                running = await _find_running_job()
+                job["status"] = "skipped"
+                job["error"] = {
+                    "error": "Refresh already running in another worker",
+                    "running_job_id": running["job_id"] if running else None,
+                }
+                return
+
+            job["status"] = "running"
+            job["started_at"] = _now()
+            await _save_job(job)
+            try:
+                async with async_session() as session:
+                    job["result"] = await fetch_external_url(session, job["force"], job["stage_timings_ms"])
+                job["status"] = "succeeded"
+            finally:
+                await _release_db_lock(conn)
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except HTTPException as e:
+            job["status"] = "failed"
+            job["error"] = e.detail
+            job["_status_code"] = e.status_code
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = {"error": "Internal server error", "detail": str(e)}
+        finally:
+            if conn is not None:
+                await conn.close()
+            job["finished_at"] = _now()
+            await _save_job(job)
+
+
+def enqueue_refresh(trigger: str = "api", force: bool = False) -> Dict[str, Any]:
+    """
+    Queues a refresh in the background and returns its job record. If a job is
+    already queued or running in this process, that job is returned instead.
+    """
+    for job in reversed(_jobs.values()):
+        if job["status"] in ("queued", "running") and (not force or job["force"]):
+            return job
+
+    job = _new_job(trigger, force)
+    task = asyncio.create_task(_run_job(job))
+    job["_task"] = task
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+async def wait_for_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Waits until the job has finished (used by ?wait=true)."""
+    task = job.get("_task")
+    if task is not None:
+        await asyncio.shield(task)
+    return job
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job record without internal fields."""
+    return {key: value for key, value in job.items() if not key.startswith("_")}
+
+
+async def _scheduler_loop() -> None:
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        job = enqueue_refresh(trigger="schedule")
+        await wait_for_job(job)
+
+
+def start_scheduler() -> None:
+    """Starts the periodic refresh (no-op when REFRESH_INTERVAL_SECONDS is 0)."""
+    global _scheduler_task
+    if REFRESH_INTERVAL_SECONDS > 0 and _scheduler_task is None:
+        _scheduler_task = asyncio.create_task(_scheduler_loop())
+
+
+async def stop_scheduler() -> None:
+    """Stops the scheduler and cancels jobs still running in this process."""
+    global _scheduler_task
+    tasks = list(_tasks) + ([_scheduler_task] if _scheduler_task else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _scheduler_task = None
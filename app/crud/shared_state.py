@@ -0,0 +1,61 @@
+from typing import Any, Dict, Optional
+from sqlmodel import select
+from sqlalchemy import update
+from ..model.country_table import SummaryCache
+from ..utils.cache import observe_generation, state_sync_due, state_synced
+from ..utils.image_cache import expire_image
+
+# State all workers must agree on lives on the single SummaryCache row:
+#   data_generation      bumped inside every write transaction, so a generation
+#                        token (X-Data-Generation) means the same on every worker
+#   image_hash           the current summary render
+#   upstream_validators  ETag / Last-Modified / body hash of the last applied refresh
+# Writers adopt the new generation when they commit; readers compare the
+# generation (and image hash) at most every STATE_SYNC_INTERVAL_SECONDS.
+
+
+async def sync_shared_state(session) -> None:
+    """
+    Adopts a newer generation committed by another worker, which invalidates
+    this process's read caches, and drops its cached image if that worker
+    published another one. No query when the last check is recent enough.
+    """
+    if not state_sync_due():
+        return
+    row = (await session.execute(select(SummaryCache.data_generation, SummaryCache.image_hash))).first()
+    state_synced()
+    if row is not None and observe_generation(row.data_generation):
+        expire_image(row.image_hash)
+
+
+async def bump_shared_generation(session, **values: Any) -> int:
+    """
+    Bumps the shared generation in the caller's write transaction (setting any
+    other SummaryCache columns given) and returns the new value, or 0 before
+    the first refresh created the row. Pass it to bump_generation() once the
+    transaction has committed.
+    """
+    await session.execute(update(SummaryCache).values(data_generation=SummaryCache.data_generation + 1, **values))
+    return await session.scalar(select(SummaryCache.data_generation)) or 0
+
+
+async def load_upstream_validators(session) -> Dict[str, Dict[str, Optional[str]]]:
+    """Validators of the last refresh applied by any worker ({} if none)."""
+    return await session.scalar(select(SummaryCache.upstream_validators)) or {}
+
+
+async def save_upstream_validators(session, validators: Dict[str, Dict[str, Optional[str]]]) -> None:
+    """Stores new validators without a data change (the caller commits)."""
+    await session.execute(update(SummaryCache).values(upstream_validators=validators))
+
+
+async def stamp_unchanged_refresh(session, refreshed_at, validators: Dict[str, Dict[str, Optional[str]]]) -> bool:
+    """
+    Records a refresh that changed no country: only the refresh time and the
+    validators, keeping the generation (and every worker's caches). Returns
+    False before the first refresh created the row (the caller commits).
+    """
+    result = await session.execute(
+        update(SummaryCache).values(last_refreshed_at=refreshed_at, upstream_validators=validators)
+    )
+    return result.rowcount > 0
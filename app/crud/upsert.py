@@ -0,0 +1,113 @@
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+from sqlmodel import select
+from sqlalchemy import insert, update, delete
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from ..model.country_table import Country
+from ..sec import REFRESH_BATCH_SIZE
+
+# Columns written by a refresh (id is generated on insert and never overwritten)
+COUNTRY_DATA_FIELDS = (
+    "name", "capital", "region", "population", "currency_code",
+    "exchange_rate", "estimated_gdp", "flag",
+)
+
+
+def normalize_country_record(country_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Applies the same normalization as the Country model validators
+    (title-case name/region, upper-case currency_code) and keeps only
+    the columns a refresh is allowed to write.
+    """
+    record = {k: country_data.get(k) for k in COUNTRY_DATA_FIELDS}
+    for key in ("name", "region"):
+        if isinstance(record[key], str) and record[key]:
+            record[key] = record[key].strip().title()
+    if isinstance(record["currency_code"], str) and record["currency_code"]:
+        record["currency_code"] = record["currency_code"].strip().upper()
+    return record
+
+
+def _batches(rows: List[Any], batch_size: int):
+    """Yields consecutive slices of at most batch_size rows."""
+    batch_size = max(1, batch_size)
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+async def _upsert_batch_mysql(session, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Writes one batch with INSERT ... ON DUPLICATE KEY UPDATE on the unique name index.
+    MySQL reports 1 affected row per insert and 2 per update, so the counts
+    come straight from rowcount without a prior SELECT.
+    """
+    stmt = mysql_insert(Country).values([{"id": str(uuid.uuid4()), **row} for row in batch])
+    stmt = stmt.on_duplicate_key_update(
+        {key: stmt.inserted[key] for key in batch[0] if key not in ("id", "name")}
+    )
+    result = await session.execute(stmt)
+    updated = max(0, result.rowcount - len(batch))
+    return len(batch) - updated, updated
+
+
+async def _upsert_batch_generic(session, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Dialect-neutral fallback (SQLite, Postgres, ...): load the ids of existing
+    rows in one IN query, then issue one bulk INSERT and one bulk UPDATE.
+    Rows that already carry their id (from the refresh diff) skip the lookup.
+    """
+    names = [row["name"] for row in batch if "id" not in row]
+    existing_ids = {}
+    if names:
+        result = await session.execute(select(Country.name, Country.id).where(Country.name.in_(names)))
+        existing_ids = dict(result.all())
+
+    to_insert = []
+    to_update = []
+    for row in batch:
+        if "id" in row:
+            to_update.append(row)
+        elif row["name"] in existing_ids:
+            to_update.append({"id": existing_ids[row["name"]], **row})
+        else:
+            to_insert.append({"id": str(uuid.uuid4()), **row})
+
+    if to_insert:
+        # render_nulls keeps one statement per batch: without it the ORM omits
+        # None values and splits rows with different null columns into separate INSERTs
+        await session.execute(insert(Country).execution_options(render_nulls=True), to_insert)
+    if to_update:
+        # ORM bulk UPDATE by primary key (executemany)
+        await session.execute(update(Country), to_update)
+    return len(to_insert), len(to_update)
+
+
+async def upsert_countries(session, rows: List[Dict[str, Any]], refreshed_at: datetime, batch_size: int = REFRESH_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Set-based UPSERT of normalized country rows, keyed on the unique Country.name.
+    Writes are staged in the caller's transaction; the caller commits.
+
+    Returns the number of inserted and updated rows.
+    """
+    rows = [{**row, "last_refreshed_at": refreshed_at} for row in rows]
+
+    upsert_batch = _upsert_batch_mysql if session.bind.dialect.name == "mysql" else _upsert_batch_generic
+
+    inserted_count = 0
+    updated_count = 0
+    for batch in _batches(rows, batch_size):
+        inserted, updated = await upsert_batch(session, batch)
+        inserted_count += inserted
+        updated_count += updated
+
+    return {"inserted": inserted_count, "updated": updated_count}
+
+
+async def delete_countries_by_name(session, names: List[str], batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """Set-based DELETE ... WHERE name IN (...) in batches. Returns the number of rows removed."""
+    deleted_count = 0
+    for batch in _batches(names, batch_size):
+        result = await session.execute(delete(Country).where(Country.name.in_(batch)))
+        deleted_count += result.rowcount
+    return deleted_count
@@ -1,24 +1,113 @@
-from .utils.database import normalize_mysql_url
-from .sec import DATABASE_URL 
+from .utils.database import normalize_mysql_url, engine_pool_options, pool_stats
+from .sec import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DATABASE_REPLICA_URLS, REPLICA_MAX_LAG_SECONDS, REPLICA_RETRY_SECONDS, REPLICA_HEALTH_TTL_SECONDS,
+)
+from .utils.cache import generation_is_fresh, current_generation, expire_state_sync
 from sqlmodel import SQLModel
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from typing import AsyncGenerator
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import AsyncGenerator, Dict, List
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
+import itertools
+import time
 
 # async MySQL URL
 ASYNC_DATABASE_URL = normalize_mysql_url(DATABASE_URL)
 
-# SQLModel engine
-engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=False,
-    future=True
-)
+def _create_engine(url):
+    """Async engine with the configured pool settings."""
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        **engine_pool_options(
+            url, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+            DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+        )
+    )
+
+# SQLModel engine (primary: all writes, and reads that need primary consistency)
+engine = _create_engine(ASYNC_DATABASE_URL)
 
 # async session maker
 async_session = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+# read replica engines (empty list: reads use the primary)
+replica_engines = [_create_engine(normalize_mysql_url(url)) for url in DATABASE_REPLICA_URLS if url]
+_replica_cycle = itertools.cycle(range(len(replica_engines)))
+# replica index -> monotonic time until which it is skipped after a connect failure
+_replica_down_until: Dict[int, float] = {}
+# replica index -> monotonic time until which its last successful probe is trusted
+_replica_healthy_until: Dict[int, float] = {}
+
+
+def _mark_replica_down(index, error) -> None:
+    _replica_down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+    _replica_healthy_until.pop(index, None)
+    print(f"Read replica {index} unavailable, skipping for {REPLICA_RETRY_SECONDS}s: {error}")
+
+
+def _watch_replica(index, replica) -> None:
+    """Marks the replica down when one of its real connections fails to open or drops."""
+    @event.listens_for(replica.sync_engine, "handle_error")
+    def on_error(context):
+        if context.connection is None or context.is_disconnect:
+            _mark_replica_down(index, context.original_exception)
+
+
+for _index, _replica in enumerate(replica_engines):
+    _watch_replica(_index, _replica)
+
+
+def _pick_replica_engine():
+    """
+    Round-robins over healthy replicas and returns the sync engine of the first
+    one that answers, or None if none can. A replica is probed (one connect,
+    returned to its pool for the session to use) at most every
+    REPLICA_HEALTH_TTL_SECONDS, not per session. Runs inside the session's greenlet.
+    """
+    now = time.monotonic()
+    for _ in range(len(replica_engines)):
+        index = next(_replica_cycle)
+        if _replica_down_until.get(index, 0) > now:
+            continue
+        replica = replica_engines[index].sync_engine
+        if _replica_healthy_until.get(index, 0) > now:
+            return replica
+        try:
+            replica.connect().close()
+        except SQLAlchemyError as e:
+            if _replica_down_until.get(index, 0) <= now:  # not already marked by the listener
+                _mark_replica_down(index, e)
+            continue
+        _replica_healthy_until[index] = now + REPLICA_HEALTH_TTL_SECONDS
+        return replica
+    return None
+
+
+class ReplicaRoutingSession(Session):
+    """
+    Sync session behind replica read sessions. The replica is picked when the
+    first statement needs a connection, so reads served from the in-process
+    caches never connect; with no healthy replica it uses the primary.
+    """
+    _read_bind = None
+
+    def get_bind(self, *args, **kwargs):
+        if self._read_bind is None:
+            self._read_bind = _pick_replica_engine() or engine.sync_engine
+        return self._read_bind
+
+
+# replica read session maker (bound lazily, see ReplicaRoutingSession)
+replica_session = async_sessionmaker(
+    bind=engine, class_=AsyncSession, sync_session_class=ReplicaRoutingSession,
+    expire_on_commit=False, info={"replica": True},
+)
+
 # async session dependency
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting an asynchronous database session."""
@@ -38,9 +127,69 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+def wants_primary(request: Request) -> bool:
+    """
+    Reads go to the primary when the client asks for it explicitly
+    (X-Consistency: primary) or passes a generation token (X-Min-Generation,
+    returned by writes) that may not have reached the replicas yet.
+    """
+    if request.headers.get("x-consistency", "").lower() == "primary":
+        return True
+    token = request.headers.get("x-min-generation")
+    if token is None:
+        return False
+    try:
+        generation = int(token)
+    except ValueError:
+        return True
+    if generation > current_generation():
+        # Written through another worker: check the shared generation on this read
+        expire_state_sync()
+    return generation_is_fresh(generation, REPLICA_MAX_LAG_SECONDS)
+
+
+# async read-only session dependency
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read endpoints: a replica session when replicas are
+    configured and the request tolerates replica lag, otherwise the primary.
+    Nothing connects until the first statement, and the session stays open
+    until the response has been sent, so streamed bodies can read from it.
+    """
+    # Evaluated even without replicas: a token from another worker triggers a shared-state check
+    primary = wants_primary(request)
+    session = replica_session() if replica_engines and not primary else async_session()
+    async with session:
+        try:
+            yield session
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"SQLAlchemy Error: {e}") 
+            raise HTTPException(status_code=500, detail="A database error occurred.")
+        except Exception:
+            await session.rollback()
+            raise
+
+
 # initialize and create db and tables
 async def init_db() -> None:
     """Initializes the database and creates all tables defined in SQLModel metadata."""
     async with engine.begin() as conn:
         # Pass the metadata to run_sync to create tables in MySQL
         await conn.run_sync(SQLModel.metadata.create_all)
+
+
+# live connection pool statistics (for /internal/pool-stats and /metrics)
+def get_pool_stats():
+    """Returns checked-in/checked-out/overflow counts and checkout wait times."""
+    stats = pool_stats(engine.sync_engine.pool)
+    if replica_engines:
+        stats["replicas"] = [pool_stats(replica_engine.sync_engine.pool) for replica_engine in replica_engines]
+    return stats
+
+
+async def dispose_engines() -> None:
+    """Closes the primary and replica connection pools."""
+    await engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
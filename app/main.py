@@ -1,9 +1,13 @@
 #importing the necessary requirements
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .databasesetup import init_db, engine
+from .databasesetup import init_db, dispose_engines, get_pool_stats
 from .setup_main import configure_cors, register_exception_handlers
-from .middleware import LoggingMiddleware 
+from .middleware import MetricsMiddleware
+from .utils.country import open_http_client, close_http_client
+from .utils.summary_image import load_font
+from .crud.refresh_jobs import start_scheduler, stop_scheduler
+from .utils.metrics import registry, pool_collector
 
 #importing routers
 from .routers import root, country
@@ -14,14 +18,20 @@ from .routers import root, country
 async def lifespan(app: FastAPI):
     """
     Handles application startup and shutdown events.
-    Initializes the database at startup.
+    Initializes the database, the shared upstream HTTP client and the
+    background refresh scheduler at startup.
     """
     await init_db()
+    await open_http_client()
+    load_font()
+    start_scheduler()
     # The 'yield' signals that the startup phase is complete and the app is ready to serve requests
     try:
         yield
     finally:
-        await engine.dispose()
+        await stop_scheduler()
+        await close_http_client()
+        await dispose_engines()
         print("Application Shutdown: Cleanup complete.")
 
 # --- FastAPI Application Instance ---
@@ -40,8 +50,11 @@ configure_cors(app)
 #handling pydantic validations error
 register_exception_handlers(app)
 
-# Adding logging middleware
-app.add_middleware(LoggingMiddleware)
+# Exporting connection pool stats on /metrics
+registry.register_collector(pool_collector(get_pool_stats))
+
+# Adding request timing/logging middleware (pure ASGI, exported on /metrics)
+app.add_middleware(MetricsMiddleware)
 
 #including routes
 app.include_router(root.router)
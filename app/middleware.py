@@ -1,44 +1,73 @@
 # app/middleware.py
 import logging
 import time
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .utils.metrics import http_request_duration, http_requests_total, http_requests_in_flight
 
 logger = logging.getLogger(__name__)
 
+# Paths that are timed but not logged
+UNLOGGED_PATHS = {"/docs", "/redoc", "/openapi.json", "/favicon.ico", "/metrics"}
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if request.url.path in ["/docs", "/redoc", "/openapi.json", "/favicon.ico"]:
-            return await call_next(request)
-        
-        start_time = time.time()
-        
-        # Log request with body for POST/PUT
-        if request.method in ["POST", "PUT", "PATCH"]:
-            try:
-                body = await request.body()
-                logger.info(f"{request.method} {request.url.path} (body size: {len(body)} bytes)")
-            except:
-                logger.info(f"{request.method} {request.url.path}")
-        else:
-            logger.info(f"{request.method} {request.url.path}")
-        
+
+class MetricsMiddleware:
+    """
+    Pure-ASGI request timing and logging layer.
+
+    Records per-route latency histograms, status counts and the in-flight gauge
+    (exported on /metrics) using the monotonic perf_counter clock. Unlike a
+    BaseHTTPMiddleware it never wraps the response in a new task or buffers the
+    request body; the logged body size comes from Content-Length.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        path = scope["path"]
+        log_request = path not in UNLOGGED_PATHS
+        status_code = 500
+        start_time = time.perf_counter()
+
+        if log_request:
+            if method in ("POST", "PUT", "PATCH"):
+                headers = dict(scope.get("headers") or [])
+                body_size = headers.get(b"content-length", b"?").decode()
+                logger.info(f"{method} {path} (body size: {body_size} bytes)")
+            else:
+                logger.info(f"{method} {path}")
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
         try:
-            response = await call_next(request)
-            duration = time.time() - start_time
-            
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            duration = time.perf_counter() - start_time
+            logger.error(f"{method} {path} FAILED after {duration:.3f}s: {str(e)}")
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            http_requests_in_flight.dec()
+            # Label by route template (e.g. /countries/{name}) to keep cardinality bounded
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "<unmatched>"
+            http_request_duration.observe(duration, method, route_label)
+            http_requests_total.inc(method, route_label, str(status_code))
+
+        if log_request:
             # Different log levels based on status
-            if response.status_code >= 500:
-                logger.error(f"{request.method} {request.url.path} [{response.status_code}] {duration:.3f}s")
-            elif response.status_code >= 400:
-                logger.warning(f"{request.method} {request.url.path} [{response.status_code}] {duration:.3f}s")
+            if status_code >= 500:
+                logger.error(f"{method} {path} [{status_code}] {duration:.3f}s")
+            elif status_code >= 400:
+                logger.warning(f"{method} {path} [{status_code}] {duration:.3f}s")
             else:
-                logger.info(f"{request.method} {request.url.path} [{response.status_code}] {duration:.3f}s")
-            
-            return response
-            
-        except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"{request.method} {request.url.path} FAILED after {duration:.3f}s: {str(e)}")
-            raise
\ No newline at end of file
+                logger.info(f"{method} {path} [{status_code}] {duration:.3f}s")
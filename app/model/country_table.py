@@ -1,11 +1,17 @@
-from typing import Optional
+from typing import Optional, List
 import uuid
 from sqlmodel import SQLModel, Field, Column
 from datetime import datetime
-from sqlalchemy import String, func, DateTime, Integer, FLOAT
+from sqlalchemy import String, func, DateTime, Integer, BigInteger, Double, FLOAT, Index, LargeBinary, JSON, Boolean
 from pydantic import field_validator
 
 class Country(SQLModel, table=True):
+    # Composite indexes backing keyset pagination on (estimated_gdp, id), alone or under a filter
+    __table_args__ = (
+        Index("ix_country_gdp_id", "estimated_gdp", "id"),
+        Index("ix_country_region_gdp_id", "region", "estimated_gdp", "id"),
+        Index("ix_country_currency_gdp_id", "currency_code", "estimated_gdp", "id"),
+    )
     id: str = Field(default_factory=lambda: str(uuid.uuid4()),sa_column=Column(String(36), primary_key=True, nullable=False))
     name: str = Field(sa_column=Column(String(100), unique=True, nullable=False, index=True))
     capital: Optional[str] = Field(default=None, sa_column=Column(String(100), nullable=True))
@@ -37,8 +43,50 @@ class SummaryCache(SQLModel, table=True):
     # We use a fixed ID since there will only ever be one summary record
     id: str = Field(default_factory=lambda: str(uuid.uuid4()),sa_column=Column(String(36), primary_key=True, nullable=False))
     
-    # Stores the PNG image data as binary (BLOB)
-    summary_image_data: bytes 
+    # Lightweight metadata only; the PNG lives in SummaryImage so /status never reads binary data
     summary_text: str = Field(sa_column=Column(String(2048), nullable=False))
     filename: str = Field(sa_column=Column(String(100), nullable=False))
+    total_countries: Optional[int] = Field(default=None, sa_column=Column(Integer, nullable=True))
+    image_hash: Optional[str] = Field(default=None, sa_column=Column(String(64), nullable=True))
     last_refreshed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False))
+    # State shared by all workers: bumped in every write transaction (the
+    # X-Data-Generation token) and the upstream ETag/Last-Modified/body hash
+    # validators of the last applied refresh (see crud/shared_state.py)
+    data_generation: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    upstream_validators: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
+
+
+class SummaryImage(SQLModel, table=True):
+    # Content-addressed PNG storage (BLOB), keyed by the SHA-256 of the bytes
+    image_hash: str = Field(sa_column=Column(String(64), primary_key=True, nullable=False))
+    image_data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class CountryAggregate(SQLModel, table=True):
+    # Per-region and per-currency rollups, rebuilt in the same transaction as the
+    # country rows they summarize; (dimension, key) is e.g. ("region", "Africa")
+    dimension: str = Field(sa_column=Column(String(16), primary_key=True, nullable=False))
+    key: str = Field(sa_column=Column(String(100), primary_key=True, nullable=False))
+    country_count: int = Field(sa_column=Column(Integer, nullable=False))
+    population_sum: int = Field(sa_column=Column(BigInteger, nullable=False))
+    # DOUBLE: sums of the single-precision country values overflow FLOAT precision
+    gdp_sum: Optional[float] = Field(default=None, sa_column=Column(Double, nullable=True))
+    gdp_min: Optional[float] = Field(default=None, sa_column=Column(Double, nullable=True))
+    gdp_max: Optional[float] = Field(default=None, sa_column=Column(Double, nullable=True))
+    # [{"name": ..., "estimated_gdp": ...}] by estimated GDP, highest first
+    top_countries: List[dict] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    last_refreshed_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
+class RefreshJob(SQLModel, table=True):
+    # Refresh job records, so GET /countries/refresh/{job_id} answers on any worker
+    job_id: str = Field(sa_column=Column(String(36), primary_key=True, nullable=False))
+    status: str = Field(sa_column=Column(String(16), nullable=False, index=True))
+    trigger: str = Field(sa_column=Column(String(16), nullable=False))
+    force: bool = Field(sa_column=Column(Boolean, nullable=False))
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False, index=True))
+    started_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+    stage_timings_ms: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    result: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    error: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
@@ -1,24 +1,59 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Response, Query
-from ..databasesetup import get_db
-from ..crud.country import fetch_external_url, get_image, delete_country, status_fetch, named_country, db_country
+from fastapi import APIRouter, HTTPException, status, Depends, Response, Query, Request
+from fastapi.responses import StreamingResponse
+from ..databasesetup import get_db, get_read_db
+from ..crud.country import get_image, delete_country, delete_countries, status_fetch, named_country, named_countries, db_country, db_country_page, stream_countries
 from typing import Optional, List
-from ..schema.country import Count, ResStatus
+from ..schema.country import Count, ResStatus, Aggregate, CountryBatch, CountryBatchRequest, CountryBulkDelete, CountryBulkDeleteRequest
+from ..crud.aggregates import list_aggregates, get_aggregate
+from ..crud.refresh_jobs import enqueue_refresh, wait_for_job, get_job, public_job
+from ..sec import PAGE_MAX_LIMIT, FAST_JSON_RESPONSES
+from ..utils.compression import negotiate_encoding, compressed_response, compress_stream
 
 router = APIRouter(tags=["Country Currency Exchange"])
 
 @router.get("/countries", response_model=List[Count], status_code=status.HTTP_200_OK)
 async def get_all_countries(
+    request: Request,
+    response: Response,
     region: Optional[str] = Query(None, description="Filter countries by region (e.g., Africa)"),
     currency: Optional[str] = Query(None, description="Filter countries by currency code (e.g., NGN)"),
     sort: Optional[str] = Query(None, description="Sort criteria: 'gdp_desc' or 'gdp_asc'") ,
-    session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    stream: bool = Query(False, description="Stream the full result as NDJSON (same as Accept: application/x-ndjson)"),
+    session = Depends(get_read_db)
 ):
     """
     Retrieves all countries from the database, supporting filtering by region and currency, 
     and sorting by estimated GDP.
+    With `limit`, returns one page and sets the X-Next-Cursor header when more rows follow.
+    With `stream=true` or `Accept: application/x-ndjson`, streams one JSON object per line.
     """
     try:
-        return await db_country(region, currency, sort, session)
+        if limit is None and cursor is None:
+            if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+                body = await stream_countries(region, currency, sort, session)
+                encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+                if encoding is None:
+                    return StreamingResponse(body, media_type="application/x-ndjson")
+                return StreamingResponse(
+                    compress_stream(body, encoding), media_type="application/x-ndjson",
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
+            if FAST_JSON_RESPONSES:
+                # Pre-encoded body (and its cached gzip/br variants): returning a
+                # Response bypasses response_model; the OpenAPI schema still documents List[Count]
+                body = await db_country(region, currency, sort, session, encoded=True)
+                return compressed_response(request, body)
+            return await db_country(region, currency, sort, session)
+
+        countries, next_cursor = await db_country_page(
+            region, currency, sort, limit or PAGE_MAX_LIMIT, cursor, session, encoded=FAST_JSON_RESPONSES)
+        if FAST_JSON_RESPONSES:
+            headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+            return compressed_response(request, countries, headers=headers)
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return countries
     except HTTPException as e:
         # Re-raise 404 or other expected HTTP errors
         raise e
@@ -30,16 +65,34 @@ async def get_all_countries(
             detail={ "error": "Internal server error" }
         )
 
-@router.post("/countries/refresh", status_code=status.HTTP_201_CREATED)
-async def all_countries_and_exchange_rate_endpoint(session=Depends(get_db)):
+@router.post("/countries/refresh", status_code=status.HTTP_202_ACCEPTED)
+async def all_countries_and_exchange_rate_endpoint(
+    response: Response,
+    force: bool = Query(False, description="Ignore upstream ETag/Last-Modified validators and always rewrite"),
+    wait: bool = Query(False, description="Block until the refresh job finishes and return its result (201)"),
+):
     try:
         """
         Endpoint to Fetch all countries and exchange rates, then cache them in the database
+        - The refresh runs as a background job: responds 202 with a job_id; poll
+          GET /countries/refresh/{job_id} for progress and per-stage timings
+        - Only one refresh runs at a time (process lock + MySQL GET_LOCK across workers);
+          a POST while a job is queued/running returns that job
+        - ?wait=true keeps the old behaviour: wait for the job and return its result with 201.
+          If another worker was already refreshing, responds 202 with that worker's job
+          (409 if it cannot be identified)
         - Match existing countries by name (case-insensitive comparison)
-        - If country exists: Update all fields including recalculating estimated_gdp with a new random multiplier
+        - A name repeated in the payload keeps its first occurrence ("duplicate_countries_skipped")
+        - If country exists and any source field changed: Update it, recalculating estimated_gdp with a new random multiplier
+        - If country exists and nothing changed: leave the row (and its last_refreshed_at) untouched
         - If country doesn't exist: Insert new record
-        - The random multiplier (1000-2000) would be generated fresh on each refresh for each country
+        - Stored countries missing from the upstream data are deleted (REFRESH_DELETE_MISSING), unless
+          none came back valid or more than REFRESH_DELETE_MAX_FRACTION would go ("countries_delete_skipped")
+        - The random multiplier (1000-2000) is generated fresh for every inserted or changed country
+        - The response breaks the changes down per field ("field_changes")
         - successful refresh would update the global last_refreshed_at timestamp
+        - If both upstream APIs report "not modified" (ETag/Last-Modified or identical body hash),
+          the refresh is skipped without touching the database and returns status "not_modified"
         - When /countries/refresh runs:
             - After saving countries in the database, generate an image (e.g., cache/summary.png) containing:
                 - Total number of countries
@@ -56,7 +109,32 @@ async def all_countries_and_exchange_rate_endpoint(session=Depends(get_db)):
             - 400  { "error": "Validation failed" }
             - 500  { "error": "Internal server error" }
         """
-        return await fetch_external_url(session)
+        job = enqueue_refresh(trigger="api", force=force)
+        if not wait:
+            return {
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": f"/countries/refresh/{job['job_id']}"
+            }
+
+        job = await wait_for_job(job)
+        if job["status"] == "skipped":
+            # Another worker holds the refresh lock: point at its job instead of an empty result
+            running_job_id = job["error"]["running_job_id"]
+            if running_job_id is None:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=job["error"])
+            return {
+                "job_id": running_job_id,
+                "status": "running",
+                "status_url": f"/countries/refresh/{running_job_id}"
+            }
+        if job["status"] == "failed":
+            raise HTTPException(
+                status_code=job.get("_status_code", status.HTTP_500_INTERNAL_SERVER_ERROR),
+                detail=job["error"]
+            )
+        response.status_code = status.HTTP_201_CREATED
+        return {**(job["result"] or {}), "job_id": job["job_id"], "job_status": job["status"], "stage_timings_ms": job["stage_timings_ms"]}
     except HTTPException as Httpexc:
         raise Httpexc 
     except Exception as e:
@@ -66,17 +144,33 @@ async def all_countries_and_exchange_rate_endpoint(session=Depends(get_db)):
         )
 
 
+@router.get("/countries/refresh/{job_id}", status_code=status.HTTP_200_OK)
+async def get_refresh_job_endpoint(job_id: str):
+    """
+    Reports a refresh job's status (queued/running/succeeded/failed/skipped),
+    its per-stage timings in milliseconds and, once finished, its result.
+    """
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={ "error": "Refresh job not found" }
+        )
+    return public_job(job)
+
+
 @router.get("/countries/image", status_code=status.HTTP_200_OK)
-async def get_summary_image_endpoint(session=Depends(get_db)):
+async def get_summary_image_endpoint(request: Request, session=Depends(get_read_db)):
     """
     Serve the generated summary image.
     
     Returns:
-        200: Summary image file
+        200: Summary image file (strong ETag, Cache-Control)
+        304: If-None-Match matches the current image
         404: Image not found
     """
     try:
-        return await get_image(session)
+        return await get_image(session, request.headers.get("if-none-match"))
     except HTTPException as e:
         # Re-raise 404 or other expected HTTP errors
         raise e
@@ -90,8 +184,75 @@ async def get_summary_image_endpoint(session=Depends(get_db)):
 
 
 
+@router.post("/countries/batch", response_model=CountryBatch, status_code=status.HTTP_200_OK)
+async def get_countries_batch(batch: CountryBatchRequest, session = Depends(get_read_db)):
+    """
+    Looks up many countries by name (case-insensitive) in one query.
+    Body: {"names": ["Nigeria", "ghana", ...]}, at most BATCH_LOOKUP_MAX_NAMES names.
+    Returns the found countries in request order and the names not found.
+    """
+    try:
+        return await named_countries(batch.names, session)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+
+
+@router.post("/countries/bulk-delete", response_model=CountryBulkDelete, status_code=status.HTTP_200_OK)
+async def bulk_delete_countries_endpoint(request: CountryBulkDeleteRequest, response: Response, session = Depends(get_db)):
+    """
+    Deletes many countries in one transaction with set-based DELETEs.
+    Body: {"names": [...]} (at most BULK_DELETE_MAX_NAMES, case-insensitive)
+    or a filter {"region": "Africa", "currency": "NGN"} (one or both).
+    Returns a status per name ("deleted" / "not_found"; with a filter, the
+    deleted names) and the new data generation, also sent as X-Data-Generation.
+    """
+    try:
+        result = await delete_countries(session, names=request.names, region=request.region, currency=request.currency)
+        response.headers["X-Data-Generation"] = str(result["data_generation"])
+        return result
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={ "error": "Internal server error" }
+        )
+
+
+@router.get("/countries/aggregates/regions", response_model=List[Aggregate], status_code=status.HTTP_200_OK)
+async def get_region_aggregates(session = Depends(get_read_db)):
+    """
+    Per-region rollups materialized by the last refresh: country count,
+    population sum, estimated GDP sum/min/max and the top countries by GDP.
+    """
+    return await list_aggregates("region", session)
+
+
+@router.get("/countries/aggregates/regions/{region}", response_model=Aggregate, status_code=status.HTTP_200_OK)
+async def get_region_aggregate(region: str, session = Depends(get_read_db)):
+    """One region's rollup (case-insensitive), read by primary key."""
+    return await get_aggregate("region", region, session)
+
+
+@router.get("/countries/aggregates/currencies", response_model=List[Aggregate], status_code=status.HTTP_200_OK)
+async def get_currency_aggregates(session = Depends(get_read_db)):
+    """Per-currency rollups materialized by the last refresh."""
+    return await list_aggregates("currency", session)
+
+
+@router.get("/countries/aggregates/currencies/{code}", response_model=Aggregate, status_code=status.HTTP_200_OK)
+async def get_currency_aggregate(code: str, session = Depends(get_read_db)):
+    """One currency's rollup (case-insensitive code), read by primary key."""
+    return await get_aggregate("currency", code, session)
+
+
 @router.get("/status", response_model=ResStatus, status_code=status.HTTP_200_OK)
-async def get_status_endpoint(session = Depends(get_db)):
+async def get_status_endpoint(session = Depends(get_read_db)):
     """
     Shows the total number of country records and the last refresh timestamp.
     """
@@ -110,7 +271,7 @@ async def get_status_endpoint(session = Depends(get_db)):
 
 
 @router.get("/countries/{name}", status_code=status.HTTP_200_OK)
-async def get_country_by_name(name: str, session = Depends(get_db)):
+async def get_country_by_name(name: str, session = Depends(get_read_db)):
     """
     Retrieves a single country record by its name (case-insensitive).
     """
@@ -133,9 +294,12 @@ async def delete_country_endpoint(name: str, session = Depends(get_db)):
     """
     Deletes a country record by name (case-insensitive) and handles the required 
     404 and 500 JSON responses.
+    The X-Data-Generation header can be sent back as X-Min-Generation on reads
+    that must observe the delete.
     """ 
     try:
-        return await delete_country(name, session)
+        generation = await delete_country(name, session)
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"X-Data-Generation": str(generation)})
     except HTTPException as e:
         # Re-raise 404 or other expected HTTP errors
         raise e
@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Response
-from ..databasesetup import get_db
+from fastapi.responses import PlainTextResponse
+from ..databasesetup import get_db, get_pool_stats
 from fastapi import Depends
 from sqlmodel import text
+from ..utils.cache import countries_cache
+from ..utils.singleflight import read_flight
+from ..utils.metrics import registry
 
 router = APIRouter(tags=["Root"])
 
@@ -26,3 +30,25 @@ async def keepalive(session=Depends(get_db)):
     await session.execute(text("SELECT 1"))
     return {"ok": True}
 
+
+@router.get("/internal/cache-stats")
+async def cache_stats():
+    """
+    Hit/miss counters and occupancy of the in-process read caches, and how
+    many reads were coalesced onto an identical in-flight query
+    """
+    return {"countries": countries_cache.stats(), "singleflight": read_flight.stats()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics (request latency histograms, status counts, in-flight gauge)
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/internal/pool-stats")
+async def pool_stats():
+    """
+    Live database connection pool statistics for pool tuning
+    """
+    return get_pool_stats()
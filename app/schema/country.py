@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
+from ..sec import BATCH_LOOKUP_MAX_NAMES, BULK_DELETE_MAX_NAMES
 
 class Count(BaseModel):
     id: str
@@ -15,6 +16,75 @@ class Count(BaseModel):
     last_refreshed_at: datetime
 
 
+class CountryBatchRequest(BaseModel):
+    names: List[str] = Field(min_length=1, max_length=BATCH_LOOKUP_MAX_NAMES)
+
+    @field_validator("names")
+    @classmethod
+    def names_not_blank(cls, value):
+        """Blank names are rejected, as GET /countries/{name} rejects them."""
+        if any(not name.strip() for name in value):
+            raise ValueError("names must not be blank")
+        return value
+
+
+class CountryBatch(BaseModel):
+    # Found countries in request order; not_found keeps the names as sent
+    countries: List[Count]
+    not_found: List[str]
+
+
+class CountryBulkDeleteRequest(BaseModel):
+    # Either names, or a region and/or currency filter
+    names: Optional[List[str]] = Field(default=None, min_length=1, max_length=BULK_DELETE_MAX_NAMES)
+    region: Optional[str] = None
+    currency: Optional[str] = None
+
+    @field_validator("names")
+    @classmethod
+    def names_not_blank(cls, value):
+        if value is not None and any(not name.strip() for name in value):
+            raise ValueError("names must not be blank")
+        return value
+
+    @model_validator(mode="after")
+    def names_or_filter(self):
+        """Exactly one selection mode; an empty filter would delete every country."""
+        has_filter = bool((self.region or "").strip() or (self.currency or "").strip())
+        if self.names is None and not has_filter:
+            raise ValueError("names, region or currency is required")
+        if self.names is not None and has_filter:
+            raise ValueError("names cannot be combined with region/currency")
+        return self
+
+
+class BulkDeleteResult(BaseModel):
+    name: str
+    status: str  # "deleted" or "not_found"
+
+
+class CountryBulkDelete(BaseModel):
+    deleted: int
+    data_generation: int
+    results: List[BulkDeleteResult]
+
+
 class ResStatus(BaseModel):
     total_countries: int
-    last_refreshed_at: datetime
\ No newline at end of file
+    last_refreshed_at: datetime
+
+class TopCountry(BaseModel):
+    name: str
+    estimated_gdp: Optional[float]
+
+
+class Aggregate(BaseModel):
+    dimension: str
+    key: str
+    country_count: int
+    population_sum: int
+    gdp_sum: Optional[float]
+    gdp_min: Optional[float]
+    gdp_max: Optional[float]
+    top_countries: List[TopCountry]
+    last_refreshed_at: datetime
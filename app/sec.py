@@ -1,3 +1,124 @@
-from decouple import config
+from decouple import config, Csv
 
-DATABASE_URL = config('DATABASE_URL')
\ No newline at end of file
+DATABASE_URL = config('DATABASE_URL')
+
+# Async engine connection pool. Size it so workers x (pool_size + max_overflow)
+# stays below MySQL max_connections; recycle below the server's wait_timeout.
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=5, cast=int)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=30.0, cast=float)
+DB_POOL_RECYCLE = config('DB_POOL_RECYCLE', default=280, cast=int)
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', default=True, cast=bool)
+
+# Optional read replicas (comma-separated URLs). Reads round-robin across them and
+# fall back to the primary; a replica that fails to connect (on its health probe,
+# at most every REPLICA_HEALTH_TTL_SECONDS, or under a real query) is skipped for
+# REPLICA_RETRY_SECONDS. Reads asking for a generation written less than
+# REPLICA_MAX_LAG_SECONDS ago go to the primary.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5.0, cast=float)
+REPLICA_RETRY_SECONDS = config('REPLICA_RETRY_SECONDS', default=30.0, cast=float)
+REPLICA_HEALTH_TTL_SECONDS = config('REPLICA_HEALTH_TTL_SECONDS', default=5.0, cast=float)
+
+# Number of country rows written per INSERT/UPDATE statement during a refresh
+REFRESH_BATCH_SIZE = config('REFRESH_BATCH_SIZE', default=500, cast=int)
+
+# Delete stored countries that no longer appear (as valid records) upstream.
+# Guard against a truncated or empty payload: the deletes are skipped when no
+# valid country came back, or when they would remove more than
+# REFRESH_DELETE_MAX_FRACTION of the stored countries (1.0 disables the limit)
+REFRESH_DELETE_MISSING = config('REFRESH_DELETE_MISSING', default=True, cast=bool)
+REFRESH_DELETE_MAX_FRACTION = config('REFRESH_DELETE_MAX_FRACTION', default=0.2, cast=float)
+
+# Countries bodies that may be unchanged are buffered and hashed before any
+# write, up to this many bytes. A larger body is streamed and written as usual;
+# if its hash still matches at the end, the transaction is rolled back
+REFRESH_HASH_BUFFER_BYTES = config('REFRESH_HASH_BUFFER_BYTES', default=8 * 1024 * 1024, cast=int)
+
+# Shared upstream HTTP client (created once in the app lifespan)
+HTTP_MAX_CONNECTIONS = config('HTTP_MAX_CONNECTIONS', default=20, cast=int)
+HTTP_MAX_KEEPALIVE_CONNECTIONS = config('HTTP_MAX_KEEPALIVE_CONNECTIONS', default=10, cast=int)
+HTTP_KEEPALIVE_EXPIRY = config('HTTP_KEEPALIVE_EXPIRY', default=60.0, cast=float)
+HTTP2_ENABLED = config('HTTP2_ENABLED', default=False, cast=bool)
+
+# Per-API request timeouts in seconds
+COUNTRIES_API_TIMEOUT = config('COUNTRIES_API_TIMEOUT', default=15.0, cast=float)
+EXCHANGE_RATE_API_TIMEOUT = config('EXCHANGE_RATE_API_TIMEOUT', default=10.0, cast=float)
+
+# Seconds between checks of the shared data generation and image hash on the
+# SummaryCache row: writes committed by another worker are seen by this one's
+# caches at most this late (0: check on every cached read)
+STATE_SYNC_INTERVAL_SECONDS = config('STATE_SYNC_INTERVAL_SECONDS', default=1.0, cast=float)
+
+# In-process read cache for GET /countries
+READ_CACHE_MAX_ENTRIES = config('READ_CACHE_MAX_ENTRIES', default=256, cast=int)
+READ_CACHE_MAX_BYTES = config('READ_CACHE_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+
+# Largest page size accepted by GET /countries?limit=
+PAGE_MAX_LIMIT = config('PAGE_MAX_LIMIT', default=500, cast=int)
+
+# Rows fetched from the server-side cursor per chunk when streaming NDJSON
+STREAM_CHUNK_ROWS = config('STREAM_CHUNK_ROWS', default=500, cast=int)
+
+# Seconds the summary image timestamp is rounded down to; identical inputs reuse the last PNG
+SUMMARY_TIMESTAMP_GRANULARITY = config('SUMMARY_TIMESTAMP_GRANULARITY', default=60, cast=int)
+
+# Summary image cache: optional directory for <sha256>.png files and client max-age
+IMAGE_CACHE_DIR = config('IMAGE_CACHE_DIR', default='')
+IMAGE_CACHE_MAX_AGE = config('IMAGE_CACHE_MAX_AGE', default=60, cast=int)
+
+# Background refresh: interval in seconds (0 disables the scheduler), MySQL
+# GET_LOCK name shared by all workers, and number of finished jobs kept (in the
+# refreshjob table) for /countries/refresh/{job_id}; at least 1, the latest job
+REFRESH_INTERVAL_SECONDS = config('REFRESH_INTERVAL_SECONDS', default=0, cast=int)
+REFRESH_LOCK_NAME = config('REFRESH_LOCK_NAME', default='country_refresh')
+REFRESH_JOB_HISTORY = max(1, config('REFRESH_JOB_HISTORY', default=50, cast=int))
+
+# Country processing: 'auto' uses the NumPy columnar path when numpy is
+# installed and the payload has at least GDP_COLUMNAR_MIN_ROWS rows ('numpy'
+# always, 'python' never). GDP_RANDOM_SEED makes the random GDP factor
+# reproducible (empty: unseeded)
+GDP_BACKEND = config('GDP_BACKEND', default='auto')
+GDP_COLUMNAR_MIN_ROWS = config('GDP_COLUMNAR_MIN_ROWS', default=5000, cast=int)
+GDP_RANDOM_SEED = config('GDP_RANDOM_SEED', default='', cast=lambda value: int(value) if value else None)
+
+# Country data source: 'upstream' (restcountries.com + open.er-api.com) or
+# 'synthetic' (generated locally, for scale and soak testing; see utils/synthetic.py)
+COUNTRY_SOURCE = config('COUNTRY_SOURCE', default='upstream')
+SYNTHETIC_ROWS = config('SYNTHETIC_ROWS', default=10000, cast=int)
+SYNTHETIC_SEED = config('SYNTHETIC_SEED', default=0, cast=int)
+SYNTHETIC_CURRENCIES = config('SYNTHETIC_CURRENCIES', default=160, cast=int)
+# Zipf exponent of currency usage (0: uniform)
+SYNTHETIC_CURRENCY_SKEW = config('SYNTHETIC_CURRENCY_SKEW', default=1.0, cast=float)
+# region:weight pairs
+SYNTHETIC_REGIONS = config('SYNTHETIC_REGIONS', default='Africa:24,Americas:21,Asia:21,Europe:22,Oceania:11,Polar:1', cast=Csv())
+# Shares of invalid records, of name collisions, and of rows changed per refresh
+SYNTHETIC_INVALID_RATE = config('SYNTHETIC_INVALID_RATE', default=0.02, cast=float)
+SYNTHETIC_COLLISION_RATE = config('SYNTHETIC_COLLISION_RATE', default=0.01, cast=float)
+SYNTHETIC_CHURN_RATE = config('SYNTHETIC_CHURN_RATE', default=0.0, cast=float)
+
+# Countries listed per region/currency aggregate (top N by estimated GDP)
+AGGREGATE_TOP_N = config('AGGREGATE_TOP_N', default=5, cast=int)
+
+# List responses: with FAST_JSON_RESPONSES, GET /countries encodes the selected
+# columns straight to JSON (no per-row Count validation) and caches the bytes
+# per data generation. JSON_ENCODER: 'auto' (orjson if installed), 'orjson' or 'json'
+FAST_JSON_RESPONSES = config('FAST_JSON_RESPONSES', default=True, cast=bool)
+JSON_ENCODER = config('JSON_ENCODER', default='auto')
+
+# Response compression (negotiated from Accept-Encoding): bodies smaller than
+# COMPRESSION_MIN_BYTES are sent uncompressed. Brotli needs the optional
+# 'brotli' package; gzip is always available
+COMPRESSION_MIN_BYTES = config('COMPRESSION_MIN_BYTES', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+
+# Concurrent identical reads (db_country, named_country, status_fetch) share one
+# in-flight query instead of each sending their own
+SINGLE_FLIGHT_ENABLED = config('SINGLE_FLIGHT_ENABLED', default=True, cast=bool)
+
+# Most names accepted by one POST /countries/batch lookup
+BATCH_LOOKUP_MAX_NAMES = config('BATCH_LOOKUP_MAX_NAMES', default=100, cast=int)
+
+# Most names accepted by one POST /countries/bulk-delete
+BULK_DELETE_MAX_NAMES = config('BULK_DELETE_MAX_NAMES', default=500, cast=int)
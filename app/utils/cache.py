@@ -0,0 +1,186 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from ..sec import READ_CACHE_MAX_ENTRIES, READ_CACHE_MAX_BYTES, REPLICA_MAX_LAG_SECONDS, STATE_SYNC_INTERVAL_SECONDS
+
+# --- Data generation ---
+# Every committed write to the country table bumps the generation. Cache
+# entries remember the generation they were read under, so a bump makes all
+# older entries stale at once (exact invalidation, no TTL). The authoritative
+# counter is SummaryCache.data_generation, bumped in each write transaction;
+# this process keeps a copy and adopts newer values written by other workers
+# at most every STATE_SYNC_INTERVAL_SECONDS (crud/shared_state.py).
+
+_generation = 0
+_generation_lock = threading.Lock()
+
+# Monotonic time each recent generation was created (used to judge replica lag)
+_bumped_at: "OrderedDict[int, float]" = OrderedDict()
+_BUMP_HISTORY = 64
+
+# Monotonic time of the next check of the shared state
+_next_state_sync = 0.0
+
+
+def current_generation() -> int:
+    """Returns the current data generation."""
+    return _generation
+
+
+def _set_generation(generation: int) -> int:
+    global _generation
+    _generation = generation
+    _bumped_at[generation] = time.monotonic()
+    while len(_bumped_at) > _BUMP_HISTORY:
+        _bumped_at.popitem(last=False)
+    return generation
+
+
+def bump_generation(at_least: int = 0) -> int:
+    """
+    Marks all cached reads as stale. Call after a write has committed, with
+    the shared generation the write transaction produced (if any).
+    """
+    with _generation_lock:
+        return _set_generation(max(_generation + 1, at_least))
+
+
+def observe_generation(generation: int) -> bool:
+    """
+    Adopts a shared generation committed by another worker. Returns True if it
+    was newer than this process's (the caches are now stale).
+    """
+    with _generation_lock:
+        if generation <= _generation:
+            return False
+        _set_generation(generation)
+        return True
+
+
+def state_sync_due() -> bool:
+    """True when the shared generation/image state should be read again."""
+    return time.monotonic() >= _next_state_sync
+
+
+def state_synced() -> None:
+    global _next_state_sync
+    _next_state_sync = time.monotonic() + STATE_SYNC_INTERVAL_SECONDS
+
+
+def expire_state_sync() -> None:
+    """Makes the next read check the shared state (a client saw a newer generation)."""
+    global _next_state_sync
+    _next_state_sync = 0.0
+
+
+def generation_is_fresh(generation: int, max_lag: float) -> bool:
+    """
+    True if a reader asking for at least this generation may not yet see it on
+    a replica: it was created less than max_lag seconds ago, or it is newer
+    than anything this process has seen yet (written through another worker).
+    """
+    if generation > _generation:
+        return True
+    bumped = _bumped_at.get(generation)
+    return bumped is not None and time.monotonic() - bumped < max_lag
+
+
+def recently_written(max_lag: float) -> bool:
+    """True if the latest generation is younger than max_lag seconds."""
+    return generation_is_fresh(_generation, max_lag)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Rough byte size of a cached value (containers of dicts/str/numbers).
+    Objects with a cache_size() method report their own size.
+    """
+    if hasattr(value, "cache_size"):
+        return value.cache_size()
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class GenerationLRUCache:
+    """
+    LRU cache whose entries are tagged with the data generation they were
+    read under. Bounded by entry count and by an estimated memory cap.
+    """
+
+    def __init__(self, name: str, max_entries: int = READ_CACHE_MAX_ENTRIES, max_bytes: int = READ_CACHE_MAX_BYTES):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value, or None on a miss or a stale generation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != _generation:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: int, from_replica: bool = False) -> None:
+        """
+        Stores a value read under the given generation (dropped if already stale).
+        Replica reads are not cached while the latest write may still be replicating.
+        """
+        if from_replica and recently_written(REPLICA_MAX_LAG_SECONDS):
+            return
+        size = estimate_size(value)
+        with self._lock:
+            if generation != _generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (generation, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy."""
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "generation": _generation,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Read-through cache for GET /countries, keyed by (region, currency, sort)
+countries_cache = GenerationLRUCache("countries")
@@ -0,0 +1,120 @@
+import gzip
+import sys
+import zlib
+from typing import AsyncIterator, Dict, Optional
+from fastapi import Response
+from ..sec import COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+# Content negotiation and compression for large read responses. Cached bodies
+# are wrapped in EncodedBody, which keeps each compressed variant next to the
+# body it came from: both live in the generation-tagged read cache, so a
+# variant is produced at most once per data generation and key.
+
+
+def _brotli_available() -> bool:
+    """Brotli needs the optional 'brotli' package (pip install brotli)."""
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Server preference when the client weighs encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if _brotli_available() else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks the content coding for an Accept-Encoding header: the supported
+    coding with the highest q-value (q=0 refuses it; '*' covers codings not
+    listed). None means identity.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    # mtime=0: identical bodies give identical bytes
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class EncodedBody:
+    """A JSON response body plus its compressed variants, filled on first use."""
+
+    __slots__ = ("body", "variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.variants: Dict[str, bytes] = {}
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        """The body in the given coding (None: identity), compressing it once."""
+        if encoding is None:
+            return self.body
+        data = self.variants.get(encoding)
+        if data is None:
+            # Concurrent first requests may both compress; either result is kept
+            data = self.variants[encoding] = compress(self.body, encoding)
+        return data
+
+    def cache_size(self) -> int:
+        # Sized when cached, before variants exist: reserve room for them
+        # (gzip/brotli output of this JSON is well under a quarter of the body)
+        return sys.getsizeof(self.body) + len(self.body) // 2
+
+
+def compressed_response(request, payload: EncodedBody, media_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> Response:
+    """Response with the negotiated variant of payload; small bodies are sent as is."""
+    headers = dict(headers or {})
+    encoding = None
+    if len(payload.body) >= COMPRESSION_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+    return Response(content=payload.variant(encoding), media_type=media_type, headers=headers)
+
+
+async def compress_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """Compresses a streamed body incrementally, flushing after every chunk."""
+    try:
+        if encoding == "br":
+            import brotli
+            compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            async for chunk in chunks:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+            return
+
+        compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+        async for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Release the source (e.g. its database session) if the client goes away
+        await chunks.aclose()
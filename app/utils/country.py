@@ -1,14 +1,40 @@
+import asyncio
+import hashlib
 import httpx
 import random # <-- Imported the random module
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException, status
 from pydantic import ValidationError
+from .json_stream import iter_json_array, JSONStreamError
+from .synthetic import SyntheticCountryStream, next_synthetic_dataset
+from ..sec import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED, COUNTRIES_API_TIMEOUT, EXCHANGE_RATE_API_TIMEOUT,
+    GDP_BACKEND, GDP_COLUMNAR_MIN_ROWS, GDP_RANDOM_SEED, COUNTRY_SOURCE,
+    REFRESH_HASH_BUFFER_BYTES,
+)
 
 # --- API Endpoints and Constants ---
 
 COUNTRIES_API_URL = "https://restcountries.com/v2/all?fields=name,capital,region,population,flag,currencies"
 EXCHANGE_RATE_API_URL = "https://open.er-api.com/v6/latest/USD"
-API_TIMEOUT = 10  # Seconds
+
+# Bounds of the random GDP factor: population × random(1000–2000) ÷ exchange_rate
+GDP_FACTOR_MIN, GDP_FACTOR_MAX = 1000.0, 2000.0
+
+# Long-lived pooled client, opened/closed by the app lifespan
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Sentinel returned by _fetch_json when the upstream payload has not changed
+NOT_MODIFIED = object()
+
+# Validators (ETag / Last-Modified / body hash) per URL. "applied" is loaded from
+# SummaryCache.upstream_validators (shared by all workers) when a refresh starts;
+# "pending" holds what the current refresh saw and is only stored, and becomes
+# "applied", once the refresh has committed, so a failed refresh never makes
+# the next one skip.
+_applied_validators: Dict[str, Dict[str, Optional[str]]] = {}
+_pending_validators: Dict[str, Dict[str, Optional[str]]] = {}
 
 class ExternalAPIError(HTTPException):
     """Custom exception for 503 Service Unavailable errors."""
@@ -21,11 +47,96 @@ class ExternalAPIError(HTTPException):
             }
         )
 
-async def _fetch_json(client: httpx.AsyncClient, url: str, api_name: str):
-    """Helper function to fetch and decode JSON with error handling."""
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def create_http_client() -> httpx.AsyncClient:
+    """Builds an AsyncClient with the configured pool limits and keep-alive."""
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    http2 = HTTP2_ENABLED and _http2_available()
+    if HTTP2_ENABLED and not http2:
+        print("HTTP2_ENABLED is set but the 'h2' package is not installed; using HTTP/1.1.")
+    return httpx.AsyncClient(limits=limits, http2=http2)
+
+async def open_http_client() -> httpx.AsyncClient:
+    """Creates the shared client at startup (idempotent)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = create_http_client()
+    return _http_client
+
+async def close_http_client() -> None:
+    """Closes the shared client at shutdown."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+def adopt_upstream_validators(validators: Dict[str, Dict[str, Optional[str]]]) -> None:
+    """Replaces the applied validators with the stored ones (call before a refresh)."""
+    _applied_validators.clear()
+    _applied_validators.update(validators)
+    _pending_validators.clear()
+
+def upstream_validators_to_apply() -> Dict[str, Dict[str, Optional[str]]]:
+    """The applied validators updated with the pending ones: what a committing refresh stores."""
+    return {**_applied_validators, **_pending_validators}
+
+def upstream_validators_changed() -> bool:
+    """True if the current refresh saw validators that differ from the applied ones."""
+    return any(_applied_validators.get(url) != validators for url, validators in _pending_validators.items())
+
+def commit_upstream_validators() -> None:
+    """Marks the validators seen by the last refresh as applied (call after commit)."""
+    _applied_validators.update(_pending_validators)
+    _pending_validators.clear()
+
+def reset_upstream_validators() -> None:
+    """Forgets all validators so the next refresh downloads and applies everything."""
+    _applied_validators.clear()
+    _pending_validators.clear()
+
+def _conditional_headers(url: str) -> Dict[str, str]:
+    """Builds If-None-Match / If-Modified-Since headers from the applied validators."""
+    validators = _applied_validators.get(url) or {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+async def _fetch_json(client: httpx.AsyncClient, url: str, api_name: str, timeout: float, conditional: bool = True):
+    """
+    Helper function to fetch and decode JSON with error handling.
+    With conditional=True, returns NOT_MODIFIED when the server answers 304 or
+    the body hash matches the last applied payload (for servers without validators).
+    """
     try:
-        response = await client.get(url, timeout=API_TIMEOUT)
+        headers = _conditional_headers(url) if conditional else {}
+        response = await client.get(url, timeout=timeout, headers=headers)
+        if response.status_code == status.HTTP_304_NOT_MODIFIED:
+            return NOT_MODIFIED
         response.raise_for_status()
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        _pending_validators[url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "content_hash": content_hash,
+        }
+        applied = _applied_validators.get(url)
+        if conditional and applied and applied.get("content_hash") == content_hash:
+            return NOT_MODIFIED
         return response.json()
     except (httpx.TimeoutException, httpx.ConnectError, httpx.HTTPStatusError):
         # Handle network errors, timeouts, and non-200 HTTP status codes
@@ -34,84 +145,308 @@ async def _fetch_json(client: httpx.AsyncClient, url: str, api_name: str):
         # Handle other unexpected errors (e.g., JSON decode failure)
         raise ExternalAPIError(api_name)
 
-async def fetch_and_process_country_data() -> List[Dict[str, Any]]:
+def _first_currency_code(country: Dict[str, Any]) -> Optional[str]:
+    """Code of the first listed currency, or None."""
+    currencies = country.get("currencies")
+    if currencies and isinstance(currencies, list) and len(currencies) > 0:
+        return currencies[0].get("code")
+    return None
+
+def process_countries_rowwise(countries_data: List[Dict[str, Any]], exchange_rates: Dict[str, float], rng=random) -> List[Dict[str, Any]]:
     """
-    Fetches country data and exchange rates, processes the data 
-    according to business rules, and returns a list of processed country dictionaries.
+    Reference implementation: applies the business rules one country at a time.
+    rng provides uniform(); pass random.Random(seed) for reproducible GDP.
     """
-    async with httpx.AsyncClient() as client:
-        # 1. Fetch Country Data
-        countries_data = await _fetch_json(
-            client,
-            COUNTRIES_API_URL,
-            "Restcountries.com"
-        )
+    processed_countries: List[Dict[str, Any]] = []
 
-        # 2. Fetch Exchange Rates
-        rates_data = await _fetch_json(
-            client,
-            EXCHANGE_RATE_API_URL,
-            "Open.er-api.com"
-        )
+    for country in countries_data:
+        currency_code: Optional[str] = None
+        exchange_rate: Optional[float] = None
+        estimated_gdp: Optional[float] = None
 
-        exchange_rates: Dict[str, float] = rates_data.get("rates", {})
+        currency_code = _first_currency_code(country)
         
-        processed_countries: List[Dict[str, Any]] = []
-
-        for country in countries_data:
-            currency_code: Optional[str] = None
-            exchange_rate: Optional[float] = None
-            estimated_gdp: Optional[float] = None
-
-            currencies = country.get("currencies")
-            if currencies and isinstance(currencies, list) and len(currencies) > 0:
-                currency_code = currencies[0].get("code")
+        # --- Rule 1: Handle cases with a currency code ---
+        if currency_code:
+            # Get the rate from the fetched data
+            rate = exchange_rates.get(currency_code)
+            # Missing or null population computes as 0 (the row fails validation anyway)
+            population = country.get("population") or 0
             
-            # --- Rule 1: Handle cases with a currency code ---
-            if currency_code:
-                # Get the rate from the fetched data
-                rate = exchange_rates.get(currency_code)
-                population = country.get("population", 0)
+            if rate is None:
+                # --- Rule 3: Currency code not found in API ---
+                exchange_rate = None
+                estimated_gdp = None 
+            else:
+                # Rate found: Perform the GDP calculation
+                exchange_rate = rate
+                
+                # Generate a random factor between 1000 and 2000
+                random_factor = rng.uniform(GDP_FACTOR_MIN, GDP_FACTOR_MAX) 
                 
-                if rate is None:
-                    # --- Rule 3: Currency code not found in API ---
-                    exchange_rate = None
-                    estimated_gdp = None 
+                # New GDP calculation: population × random(1000–2000) ÷ exchange_rate
+                if rate != 0:
+                    estimated_gdp = (population * random_factor) / rate
                 else:
-                    # Rate found: Perform the GDP calculation
-                    exchange_rate = rate
-                    
-                    # Generate a random factor between 1000 and 2000
-                    random_factor = random.uniform(1000.0, 2000.0) 
-                    
-                    # New GDP calculation: population × random(1000–2000) ÷ exchange_rate
-                    if rate != 0:
-                        estimated_gdp = (population * random_factor) / rate
-                    else:
-                        estimated_gdp = 0.0 # Avoid division by zero
-            
-            else:
-                # --- Rule 2: Currencies array is empty or invalid ---
-                # Set estimated_gdp to 0 as per rule (even if we initialized it to None, 
-                # we explicitly set it to 0.0 here if currency is missing.)
-                estimated_gdp = 0.0
-                exchange_rate = None
-                currency_code = None
+                    estimated_gdp = 0.0 # Avoid division by zero
+        
+        else:
+            # --- Rule 2: Currencies array is empty or invalid ---
+            # Set estimated_gdp to 0 as per rule (even if we initialized it to None, 
+            # we explicitly set it to 0.0 here if currency is missing.)
+            estimated_gdp = 0.0
+            exchange_rate = None
+            currency_code = None
 
 
 
-            # Final Country Record for DB insertion
-            processed_countries.append({
-                "name": country.get("name"),
-                "capital": country.get("capital"),
-                "region": country.get("region"),
-                "population": country.get("population"),
-                "flag": country.get("flag"),
-                "currency_code": currency_code,
-                "exchange_rate": exchange_rate,
-                "estimated_gdp": estimated_gdp
-            })
-            
-        return processed_countries
+        # Final Country Record for DB insertion
+        processed_countries.append({
+            "name": country.get("name"),
+            "capital": country.get("capital"),
+            "region": country.get("region"),
+            "population": country.get("population"),
+            "flag": country.get("flag"),
+            "currency_code": currency_code,
+            "exchange_rate": exchange_rate,
+            "estimated_gdp": estimated_gdp
+        })
+        
+    return processed_countries
+
+def validation_error(name: Optional[str], validation_errors: Dict[str, str]) -> Dict[str, Any]:
+    """Entry of the refresh response's "errors" list for a skipped record."""
+    return {
+        "error": "Validation failed",
+        "details": validation_errors,
+        "name": name,
+    }
+
+def validate_countries_rowwise(processed_countries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Reference implementation: splits processed records into (valid, invalid)."""
+    invalid_countries = []
+    valid_countries = []
+    for country_data in processed_countries:
+        # --- CUSTOM VALIDATION STEP ---
+        validation_errors = {}
+        if not country_data.get("name"):
+            validation_errors["name"] = "is required"
+        if country_data.get("population") is None:
+            validation_errors["population"] = "is required"
+        if country_data.get("currency_code") is None:
+            # This catches Antarctica and other countries missing currency codes
+            validation_errors["currency_code"] = "is required (Missing currency code from external API)"
+    
+        if validation_errors:
+            invalid_countries.append(validation_error(country_data.get("name", "Unknown Country"), validation_errors))
+            continue # Skip invalid record
+
+        valid_countries.append(country_data)
+    return valid_countries, invalid_countries
+
+def _numpy_available() -> bool:
+    """The columnar path needs the optional 'numpy' package."""
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def gdp_rng(seed: Optional[int] = GDP_RANDOM_SEED):
+    """Source of the random GDP factor: seeded and private, or the global random module."""
+    return random.Random(seed) if seed is not None else random
+
+def process_country_payload(countries_data: List[Dict[str, Any]], exchange_rates: Dict[str, float], seed: Optional[int] = GDP_RANDOM_SEED, backend: str = GDP_BACKEND, rng=None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Applies the business rules and validation to an upstream payload and
+    returns (valid_countries, invalid_countries). Uses the NumPy columnar path
+    for large payloads (see GDP_BACKEND); below GDP_COLUMNAR_MIN_ROWS the array
+    setup costs more than it saves. Both paths draw the GDP factors from
+    random.Random(seed) in row order, so with a seed they return identical output.
+    Pass one rng (from gdp_rng) across consecutive batches of a payload to get
+    the same factors as processing it whole.
+    """
+    rng = rng if rng is not None else gdp_rng(seed)
+    columnar = backend == "numpy" or (backend == "auto" and len(countries_data) >= GDP_COLUMNAR_MIN_ROWS)
+    if columnar and _numpy_available():
+        from .country_columns import process_and_validate_columnar
+        return process_and_validate_columnar(countries_data, exchange_rates, rng)
+    if backend == "numpy":
+        print("GDP_BACKEND is 'numpy' but the 'numpy' package is not installed; using the per-row path.")
+    return validate_countries_rowwise(process_countries_rowwise(countries_data, exchange_rates, rng))
+
+def processing_batch_size(batch_size: int, backend: str = GDP_BACKEND) -> int:
+    """
+    Rows handed to each process_country_payload call of a streamed refresh.
+    With backend 'auto' and NumPy installed this is at least
+    GDP_COLUMNAR_MIN_ROWS, so large payloads actually take the columnar path;
+    the database work is still split into batch_size chunks by the caller.
+    """
+    if backend == "auto" and _numpy_available():
+        return max(batch_size, GDP_COLUMNAR_MIN_ROWS)
+    return batch_size
+
+class CountryStream:
+    """
+    Countries payload being streamed from the upstream API, plus the (small,
+    fully parsed) exchange rates it is processed against. Country objects are
+    parsed one at a time from the response bytes and handed out in batches;
+    the body hash is only known once the stream has been read to the end.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, owns_client: bool, response: httpx.Response, exchange_rates: Dict[str, float], rates_changed: bool, force: bool):
+        self._client = client
+        self._owns_client = owns_client
+        self._response = response
+        self.exchange_rates = exchange_rates
+        self._rates_changed = rates_changed
+        self._force = force
+        self._content_hash: Optional[str] = None
+
+    def _may_be_unchanged(self) -> bool:
+        """
+        True if this body may equal the last applied one: not forced, rates
+        unchanged, a hash to compare with, and no new validators announcing a
+        change (typically an upstream that sends no ETag/Last-Modified at all).
+        """
+        if self._force or self._rates_changed:
+            return False
+        applied = _applied_validators.get(COUNTRIES_API_URL)
+        if not applied or not applied.get("content_hash"):
+            return False
+        etag = self._response.headers.get("etag")
+        last_modified = self._response.headers.get("last-modified")
+        return (etag, last_modified) == (applied.get("etag"), applied.get("last_modified"))
+
+    async def batches(self, batch_size: int):
+        """
+        Yields lists of at most batch_size raw country objects, in payload order.
+        When the body may be unchanged, up to REFRESH_HASH_BUFFER_BYTES of its
+        raw bytes are buffered first: if the whole body fits and its hash
+        matches, nothing is yielded, so a no-op refresh never reaches the
+        database. Otherwise the objects are parsed as the bytes stream in (the
+        hash of a larger body is only compared once it has been read).
+        """
+        hasher = hashlib.sha256()
+
+        async def hashed_chunks():
+            async for chunk in self._response.aiter_bytes():
+                hasher.update(chunk)
+                yield chunk
+
+        async def replay(buffered, rest):
+            for chunk in buffered:
+                yield chunk
+            if rest is not None:
+                async for chunk in rest:
+                    yield chunk
+
+        chunks = hashed_chunks()
+        batch: List[Dict[str, Any]] = []
+        try:
+            if self._may_be_unchanged():
+                buffered, size, complete = [], 0, True
+                async for chunk in chunks:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                    if size > REFRESH_HASH_BUFFER_BYTES:
+                        complete = False
+                        break
+                if complete:
+                    self._set_content_hash(hasher.hexdigest())
+                    if not self.changed:
+                        return
+                chunks = replay(buffered, None if complete else chunks)
+
+            async for country in iter_json_array(chunks):
+                batch.append(country)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        except (httpx.HTTPError, JSONStreamError):
+            # Network failure or malformed JSON mid-stream
+            raise ExternalAPIError("Restcountries.com")
+        if batch:
+            yield batch
+
+        self._set_content_hash(hasher.hexdigest())
+
+    def _set_content_hash(self, content_hash: str) -> None:
+        self._content_hash = content_hash
+        _pending_validators[COUNTRIES_API_URL] = {
+            "etag": self._response.headers.get("etag"),
+            "last_modified": self._response.headers.get("last-modified"),
+            "content_hash": content_hash,
+        }
+
+    @property
+    def changed(self) -> bool:
+        """After the stream is consumed: False if neither the countries body nor the rates changed."""
+        if self._force or self._rates_changed or self._content_hash is None:
+            return True
+        applied = _applied_validators.get(COUNTRIES_API_URL)
+        return not applied or applied.get("content_hash") != self._content_hash
+
+    async def aclose(self) -> None:
+        await self._response.aclose()
+        if self._owns_client:
+            await self._client.aclose()
+
+async def _open_stream(client: httpx.AsyncClient, url: str, api_name: str, timeout: float, conditional: bool = True):
+    """Sends a streamed GET. Returns NOT_MODIFIED on 304, else the open response (caller closes it)."""
+    try:
+        headers = _conditional_headers(url) if conditional else {}
+        request = client.build_request("GET", url, timeout=timeout, headers=headers)
+        response = await client.send(request, stream=True)
+    except httpx.HTTPError:
+        raise ExternalAPIError(api_name)
+    if response.status_code == status.HTTP_304_NOT_MODIFIED:
+        await response.aclose()
+        return NOT_MODIFIED
+    if response.is_error:
+        await response.aclose()
+        raise ExternalAPIError(api_name)
+    return response
+
+async def open_country_stream(force: bool = False) -> Optional[CountryStream]:
+    """
+    Fetches the exchange rates and opens the countries response as a stream,
+    concurrently. Returns None when both sources answer "not modified" from
+    their validators (unless force=True). The caller must aclose() the stream.
+    With COUNTRY_SOURCE=synthetic, returns a generated dataset instead.
+    """
+    if COUNTRY_SOURCE == "synthetic":
+        return SyntheticCountryStream(next_synthetic_dataset())
+    owns_client = _http_client is None
+    # Outside the app lifespan (scripts, shell): use a short-lived client
+    client = create_http_client() if owns_client else _http_client
+    countries_args = (COUNTRIES_API_URL, "Restcountries.com", COUNTRIES_API_TIMEOUT)
+    rates_args = (EXCHANGE_RATE_API_URL, "Open.er-api.com", EXCHANGE_RATE_API_TIMEOUT)
+    response = None
+    try:
+        rates_data, response = await asyncio.gather(
+            _fetch_json(client, *rates_args, conditional=not force),
+            _open_stream(client, *countries_args, conditional=not force),
+            return_exceptions=True,
+        )
+        for result in (rates_data, response):
+            if isinstance(result, BaseException):
+                raise result
+        if rates_data is NOT_MODIFIED and response is NOT_MODIFIED:
+            if owns_client:
+                await client.aclose()
+            return None
 
-            
\ No newline at end of file
+        # Only one side changed: the other is still needed for processing
+        rates_changed = rates_data is not NOT_MODIFIED
+        if response is NOT_MODIFIED:
+            response = await _open_stream(client, *countries_args, conditional=False)
+        if rates_data is NOT_MODIFIED:
+            rates_data = await _fetch_json(client, *rates_args, conditional=False)
+        return CountryStream(client, owns_client, response, rates_data.get("rates", {}), rates_changed, force)
+    except BaseException:
+        if isinstance(response, httpx.Response):
+            await response.aclose()
+        if owns_client:
+            await client.aclose()
+        raise
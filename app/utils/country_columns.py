@@ -0,0 +1,90 @@
+import numpy as np # Optional dependency: imported only when the columnar path is selected
+from typing import Any, Dict, List, Tuple
+from .country import GDP_FACTOR_MIN, GDP_FACTOR_MAX, _first_currency_code, validation_error
+
+# Columnar version of process_countries_rowwise + validate_countries_rowwise.
+# Fields are pulled out of the payload once, the rate lookup is a join over
+# the distinct currency codes, and GDP and validation are computed as array
+# operations. Output is identical to the per-row reference for the same rng.
+
+
+def _uniform_like(rng, count: int) -> np.ndarray:
+    """
+    Draws count values exactly as count calls to rng.uniform(MIN, MAX) would.
+    Python's random and NumPy's legacy RandomState are both MT19937 with the
+    same 53-bit doubles, so the generator state is copied across and back.
+    """
+    _, internal, gauss_next = rng.getstate()
+    state = np.random.RandomState()
+    state.set_state(("MT19937", np.array(internal[:-1], dtype=np.uint32), internal[-1]))
+    samples = state.random_sample(count)
+    _, key, pos, _, _ = state.get_state()
+    rng.setstate((3, tuple(int(word) for word in key) + (int(pos),), gauss_next))
+    return GDP_FACTOR_MIN + (GDP_FACTOR_MAX - GDP_FACTOR_MIN) * samples
+
+
+def process_and_validate_columnar(countries_data: List[Dict[str, Any]], exchange_rates: Dict[str, float], rng) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Returns (valid_countries, invalid_countries) like the per-row reference."""
+    count = len(countries_data)
+    names = [country.get("name") for country in countries_data]
+    populations = [country.get("population") for country in countries_data]
+    codes = [_first_currency_code(country) or None for country in countries_data]
+
+    # Join: factorize the currency codes, look each distinct code up once, then
+    # broadcast the rate back to the rows through the code index
+    code_index: Dict[Any, int] = {}
+    row_codes = np.fromiter((code_index.setdefault(code, len(code_index)) for code in codes), dtype=np.intp, count=count)
+    distinct_rates = [exchange_rates.get(code) if code else None for code in code_index]
+    rate_known = np.array([rate is not None for rate in distinct_rates], dtype=bool)[row_codes]
+    rates = np.array([np.nan if rate is None else rate for rate in distinct_rates], dtype=np.float64)[row_codes]
+
+    has_code = np.array([code is not None for code in code_index], dtype=bool)[row_codes]
+    has_rate = has_code & rate_known
+    population_values = np.array([population or 0 for population in populations], dtype=np.float64)
+
+    # GDP = population × random(1000–2000) ÷ rate; 0 without a currency or with a zero rate
+    gdp = np.zeros(count, dtype=np.float64)
+    factors = _uniform_like(rng, int(has_rate.sum()))
+    rated_rates = rates[has_rate]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rated_gdp = population_values[has_rate] * factors / rated_rates
+    gdp[has_rate] = np.where(rated_rates != 0, rated_gdp, 0.0)
+
+    # Validation masks
+    name_ok = np.array([bool(name) for name in names], dtype=bool)
+    population_ok = np.array([population is not None for population in populations], dtype=bool)
+    valid_mask = name_ok & population_ok & has_code
+
+    # Back to records: convert the columns to Python lists once (indexing NumPy
+    # arrays element by element is slower than the per-row reference)
+    gdp_values = np.where(has_code & ~rate_known, np.nan, gdp).tolist()
+    has_rate_values = has_rate.tolist()
+    valid_countries = []
+    for i in np.flatnonzero(valid_mask).tolist():
+        country = countries_data[i]
+        code = codes[i]
+        estimated_gdp = gdp_values[i]
+        valid_countries.append({
+            "name": names[i],
+            "capital": country.get("capital"),
+            "region": country.get("region"),
+            "population": populations[i],
+            "flag": country.get("flag"),
+            "currency_code": code,
+            "exchange_rate": exchange_rates.get(code) if has_rate_values[i] else None,
+            "estimated_gdp": None if estimated_gdp != estimated_gdp else estimated_gdp,  # NaN: rate unknown
+        })
+
+    invalid_countries = []
+    name_ok_values, population_ok_values = name_ok.tolist(), population_ok.tolist()
+    for i in np.flatnonzero(~valid_mask).tolist():
+        validation_errors = {}
+        if not name_ok_values[i]:
+            validation_errors["name"] = "is required"
+        if not population_ok_values[i]:
+            validation_errors["population"] = "is required"
+        if codes[i] is None:
+            validation_errors["currency_code"] = "is required (Missing currency code from external API)"
+        invalid_countries.append(validation_error(names[i], validation_errors))
+
+    return valid_countries, invalid_countries
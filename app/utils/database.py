@@ -1,3 +1,8 @@
+import time
+from typing import Any, Dict
+from sqlalchemy import exc, select
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
 def normalize_mysql_url(url):
     """
     Converts a standard mysql:// URL to the asynchronous dialect
@@ -9,6 +14,10 @@ def normalize_mysql_url(url):
     # Convert mysql:// to mysql+mysqldb://
     if url.startswith("mysql://") and not url.startswith("mysql+mysqldb://"):
         url = url.replace("mysql://", "mysql+aiomysql://", 1)
+
+    # Non-MySQL URLs (e.g. sqlite+aiosqlite:// for local testing) are used as-is
+    if not url.startswith("mysql"):
+        return url
         
     # Remove ?sslmode=require (common in cloud providers) - check if Aiven needs it
     if "?ssl-mode=" in url:
@@ -20,4 +29,87 @@ def normalize_mysql_url(url):
     elif "charset=" not in url:
         url += "&charset=utf8mb4"
 
-    return url
\ No newline at end of file
+    return url
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records how long each checkout waited
+    (including overflow connects and pre-ping) and how many timed out.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # Keep the counters across engine.dispose() / pool recreation
+        new_pool = super().recreate()
+        for key in ("checkouts", "timeouts", "wait_total", "wait_max"):
+            setattr(new_pool, key, getattr(self, key))
+        return new_pool
+
+
+def pool_stats(pool) -> Dict[str, Any]:
+    """Live pool occupancy plus checkout wait statistics (when available)."""
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, TimedAsyncQueuePool):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.timeouts,
+            "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            "wait_max_ms": round(pool.wait_max * 1000, 3),
+        })
+    return stats
+
+
+def engine_pool_options(url, pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping) -> Dict[str, Any]:
+    """
+    create_async_engine pool arguments. In-memory SQLite needs its single
+    shared StaticPool connection, so only pre-ping applies there.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":")):
+        return {"pool_pre_ping": pool_pre_ping}
+    return {
+        "poolclass": TimedAsyncQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def merge_scalar_selects(*statements):
+    """
+    Folds independent single-value SELECTs into one statement with one scalar
+    subquery per column, so they cost a single round trip on any dialect.
+    Each statement must return at most one row with one column.
+    """
+    return select(*[stmt.limit(1).scalar_subquery() for stmt in statements])
+
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import re
+from typing import Optional, Dict, Any
+from fastapi import Response
+from fastapi.responses import FileResponse
+from ..sec import IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_AGE
+
+# Content-addressed cache of the current summary PNG, keyed by its SHA-256.
+# Populated when a refresh commits (or from the DB BLOB on a cold start) and
+# kept per process; renders published by other workers are picked up through
+# SummaryCache.image_hash (crud/shared_state.py). With IMAGE_CACHE_DIR set, the bytes are also written to
+# <dir>/<sha256>.png and served with FileResponse instead of from memory.
+
+_current: Dict[str, Any] = {"digest": None, "data": None, "path": None}
+
+# Files this cache writes (and may prune): <sha256 hex>.png
+_RENDER_FILE = re.compile(r"[0-9a-f]{64}\.png")
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_file(digest: str, data: bytes) -> Optional[str]:
+    """
+    Writes <dir>/<digest>.png atomically and prunes older renders. Only
+    digest-named files are removed, so the directory may hold other PNGs.
+    """
+    if not IMAGE_CACHE_DIR:
+        return None
+    try:
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        path = os.path.join(IMAGE_CACHE_DIR, f"{digest}.png")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+        for name in os.listdir(IMAGE_CACHE_DIR):
+            if _RENDER_FILE.fullmatch(name) and name != f"{digest}.png":
+                os.remove(os.path.join(IMAGE_CACHE_DIR, name))
+        return path
+    except OSError as e:
+        # Disk is an optimization only; fall back to serving from memory
+        print(f"Image cache disk write failed: {e}")
+        return None
+
+
+def publish_image(data: bytes) -> str:
+    """Makes the given PNG the current summary image. Returns its digest."""
+    digest = image_digest(data)
+    if _current["digest"] != digest:
+        _current.update({"digest": digest, "data": data, "path": _write_file(digest, data)})
+    return digest
+
+
+def expire_image(digest: Optional[str]) -> None:
+    """Forgets the cached image if the shared digest names another render."""
+    if _current["digest"] is not None and _current["digest"] != digest:
+        _current.update({"digest": None, "data": None, "path": None})
+
+
+def cached_image() -> Optional[Dict[str, Any]]:
+    """The current image entry, or None before the first publish."""
+    return _current if _current["digest"] else None
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def image_response(if_none_match: Optional[str] = None) -> Optional[Response]:
+    """
+    Builds the response for the cached image: 304 when If-None-Match matches
+    the strong ETag, otherwise the PNG (zero-copy file response when on disk).
+    Returns None if nothing is cached yet.
+    """
+    entry = cached_image()
+    if entry is None:
+        return None
+
+    etag = f'"{entry["digest"]}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={IMAGE_CACHE_MAX_AGE}"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if entry["path"] and os.path.exists(entry["path"]):
+        return FileResponse(entry["path"], media_type="image/png", headers=headers)
+    return Response(content=entry["data"], media_type="image/png", headers=headers)
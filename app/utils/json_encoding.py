@@ -0,0 +1,57 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Callable
+from ..sec import JSON_ENCODER
+
+# Fast JSON encoding for responses built from trusted rows (read from our own
+# tables, so they already satisfy the response schema). Output matches what
+# FastAPI produces through the Pydantic models: datetimes in ISO 8601 with "Z"
+# for UTC, and, like Starlette's JSONResponse, compact separators, UTF-8
+# output (non-ASCII characters not escaped) and no NaN/Infinity.
+
+
+def _orjson_available() -> bool:
+    """orjson is optional (pip install orjson); the standard library is the fallback."""
+    try:
+        import orjson  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _json_default(value):
+    """Datetime fallback for json.dumps, formatted like Pydantic."""
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.utcoffset() == timedelta(0):
+            text = text[:-len("+00:00")] + "Z"
+        return text
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(
+        value, default=_json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _select_encoder(name: str) -> Callable[[Any], bytes]:
+    if name == "json" or (name == "auto" and not _orjson_available()):
+        return _stdlib_dumps
+    if name == "orjson" and not _orjson_available():
+        print("JSON_ENCODER is 'orjson' but the package is not installed; using the json module.")
+        return _stdlib_dumps
+
+    import orjson
+    def _orjson_dumps(value: Any) -> bytes:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_UTC_Z)
+    return _orjson_dumps
+
+
+# Encoder picked once at import from JSON_ENCODER
+dumps_bytes = _select_encoder(JSON_ENCODER)
+
+
+def dumps_lines(rows) -> bytes:
+    """NDJSON: one encoded object per line."""
+    return b"".join(dumps_bytes(row) + b"\n" for row in rows)
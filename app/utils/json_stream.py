@@ -0,0 +1,89 @@
+import codecs
+import json
+from typing import Any, AsyncIterator
+
+# Incremental parser for a top-level JSON array, fed from streamed response
+# bytes. Elements are decoded one at a time with JSONDecoder.raw_decode, so
+# memory holds the unparsed tail of the stream plus the current element
+# rather than the whole document.
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class JSONStreamError(ValueError):
+    """The streamed document is not a well-formed JSON array."""
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yields the elements of a JSON array whose UTF-8 bytes arrive in chunks."""
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = finished = False
+    expect_value = True  # after '[' or ','
+    empty = True  # no element seen yet, so ']' may directly follow '['
+    eof = False
+    chunk_iter = chunks.__aiter__()
+
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos < len(buffer) or eof:
+            if not started:
+                if pos >= len(buffer):
+                    raise JSONStreamError("Empty document")
+                if buffer[pos] != "[":
+                    raise JSONStreamError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if finished:
+                if pos < len(buffer):
+                    raise JSONStreamError("Unexpected data after the array")
+                return
+            if pos >= len(buffer):
+                raise JSONStreamError("Truncated array")
+
+            char = buffer[pos]
+            if char == "]" and (not expect_value or empty):
+                finished = True
+                pos += 1
+                continue
+            if not expect_value:
+                if char != ",":
+                    raise JSONStreamError(f"Expected ',' or ']' at offset {pos}")
+                expect_value = True
+                pos += 1
+                continue
+
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                value, end = None, -1
+            # Only accept a value once the ',' or ']' after it has arrived (or the
+            # stream has ended): a number cut at a chunk boundary would otherwise
+            # decode as a shorter, wrong value.
+            follows = _skip_whitespace(buffer, end) if end != -1 else len(buffer)
+            if end != -1 and (eof or (follows < len(buffer) and buffer[follows] in ",]")):
+                yield value
+                pos = end
+                expect_value = empty = False
+                continue
+            if eof:
+                raise JSONStreamError(f"Invalid JSON value at offset {pos}")
+
+        # Need more input: drop the consumed prefix and read the next chunk
+        buffer = buffer[pos:]
+        pos = 0
+        try:
+            chunk = await chunk_iter.__anext__()
+            buffer += utf8.decode(chunk)
+        except StopAsyncIteration:
+            buffer += utf8.decode(b"", final=True)
+            eof = True
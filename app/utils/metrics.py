@@ -0,0 +1,194 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Minimal in-process Prometheus registry (text exposition format 0.0.4).
+# Metrics are per worker process; scrape every worker or run a single one.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set."""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Layout: one slot per bucket, then +Inf, then sum
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+        state[len(self.buckets)] += 1
+        state[-1] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, state in self.values.items():
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {state[len(self.buckets)]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and collector callbacks and renders them for /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """Registers a callback run before each render to refresh gauges from live state."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- HTTP metrics recorded by app.middleware.MetricsMiddleware ---
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route"))
+http_requests_total = registry.counter(
+    "http_requests_total", "Responses by route template and status code", ("method", "route", "status"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served")
+
+# --- Refresh pipeline stages ---
+refresh_stage_duration = registry.histogram(
+    "refresh_stage_duration_seconds", "Duration of each country refresh stage", ("stage",))
+
+
+class StageTimer:
+    """
+    Times refresh stages that interleave (the streamed refresh runs
+    fetch/validate/diff/write once per batch): time is summed per stage and
+    flush() records one observation per stage into the histogram and, if
+    given, a {stage: ms} dict.
+    """
+
+    def __init__(self, timings: Optional[Dict[str, float]] = None):
+        self.timings = timings
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - start
+
+    def flush(self) -> None:
+        for stage, elapsed in self.totals.items():
+            refresh_stage_duration.observe(elapsed, stage)
+            if self.timings is not None:
+                self.timings[stage] = round(elapsed * 1000, 3)
+        self.totals.clear()
+
+# --- Read request coalescing (app.utils.singleflight) ---
+singleflight_requests_total = registry.counter(
+    "singleflight_requests_total", "Coalesced reads by function; role 'leader' ran the query, 'follower' shared its result", ("function", "role"))
+
+# --- Database pool (refreshed at scrape time by a collector registered in app.main) ---
+db_pool_connections = registry.gauge(
+    "db_pool_connections", "Connection pool occupancy by state", ("state",))
+db_pool_checkout_wait_seconds_max = registry.gauge(
+    "db_pool_checkout_wait_seconds_max", "Longest connection checkout wait since startup")
+db_pool_checkout_timeouts = registry.gauge(
+    "db_pool_checkout_timeouts", "Connection checkouts that hit pool_timeout since startup")
+
+
+def pool_collector(get_stats: Callable[[], Dict]) -> Callable[[], None]:
+    """Builds a collector copying pool stats into the db_pool_* gauges."""
+    def collect() -> None:
+        stats = get_stats()
+        for state in ("size", "checked_in", "checked_out", "overflow"):
+            if state in stats:
+                db_pool_connections.set(state, value=stats[state])
+        if "wait_max_ms" in stats:
+            db_pool_checkout_wait_seconds_max.set(value=stats["wait_max_ms"] / 1000)
+            db_pool_checkout_timeouts.set(value=stats["checkout_timeouts"])
+    return collect
@@ -0,0 +1,91 @@
+import base64
+import json
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+from ..model.country_table import Country
+
+# Keyset pagination for GET /countries.
+# - sort=gdp_desc / gdp_asc: ordered by (estimated_gdp, id), NULL GDPs sort
+#   first ascending and last descending (MySQL and SQLite agree on this)
+# - no sort: ordered by the unique name
+# Each page seeks past the last row of the previous one, so page N costs the
+# same as page 1 (no OFFSET scan).
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Packs the last row's sort key into an opaque URL-safe token."""
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: Optional[str]) -> Dict[str, Any]:
+    """Unpacks a cursor and checks it was issued for the same sort order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload.get("s") != sort:
+            raise ValueError("cursor was issued for a different sort")
+        if sort is None and not isinstance(payload.get("n"), str):
+            raise ValueError("missing name")
+        if sort is not None and not isinstance(payload.get("i"), str):
+            raise ValueError("missing id")
+        return payload
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Validation failed", "details": {"cursor": "is invalid"}}
+        )
+
+
+def gdp_sort_key():
+    """
+    estimated_gdp widened to DOUBLE for the cursor. MySQL sends FLOAT columns
+    over the text protocol rounded to 6 digits, which would not compare equal
+    to the stored value; FLOAT + 0.0 is computed as DOUBLE and round-trips exactly.
+    """
+    return (Country.estimated_gdp + 0.0).label("gdp_key")
+
+
+def apply_keyset(stmt, sort: Optional[str], cursor: Optional[Dict[str, Any]]):
+    """Adds the ORDER BY and the seek condition for the requested sort."""
+    if sort == "gdp_desc":
+        stmt = stmt.order_by(Country.estimated_gdp.desc(), Country.id.desc())
+        if cursor is not None:
+            gdp, last_id = cursor.get("g"), cursor["i"]
+            if gdp is None:
+                # Already in the trailing NULL block
+                stmt = stmt.where(and_(Country.estimated_gdp.is_(None), Country.id < last_id))
+            else:
+                stmt = stmt.where(or_(
+                    Country.estimated_gdp < gdp,
+                    and_(Country.estimated_gdp == gdp, Country.id < last_id),
+                    Country.estimated_gdp.is_(None),
+                ))
+    elif sort == "gdp_asc":
+        stmt = stmt.order_by(Country.estimated_gdp.asc(), Country.id.asc())
+        if cursor is not None:
+            gdp, last_id = cursor.get("g"), cursor["i"]
+            if gdp is None:
+                # Still in the leading NULL block
+                stmt = stmt.where(or_(
+                    and_(Country.estimated_gdp.is_(None), Country.id > last_id),
+                    Country.estimated_gdp.is_not(None),
+                ))
+            else:
+                stmt = stmt.where(or_(
+                    Country.estimated_gdp > gdp,
+                    and_(Country.estimated_gdp == gdp, Country.id > last_id),
+                ))
+    else:
+        stmt = stmt.order_by(Country.name.asc())
+        if cursor is not None:
+            stmt = stmt.where(Country.name > cursor["n"])
+    return stmt
+
+
+def cursor_for_row(sort: Optional[str], country: Country, gdp_key: Optional[float]) -> str:
+    """Builds the cursor pointing just past the given row."""
+    if sort is None:
+        return encode_cursor({"s": None, "n": country.name})
+    return encode_cursor({"s": sort, "g": gdp_key, "i": country.id})
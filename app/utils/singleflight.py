@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from ..sec import SINGLE_FLIGHT_ENABLED
+from .cache import current_generation
+from .metrics import singleflight_requests_total
+
+# Single-flight coalescing for read queries: while a call is in flight, later
+# calls with the same key await its result (or exception) instead of running
+# the query again. Keys include the data generation, so a read that starts
+# after a write committed never joins a query that started before it, and the
+# session kind (primary/replica), so primary-pinned reads stay on the primary.
+
+
+class _LeaderCancelled(Exception):
+    """The request running the shared call went away before it finished."""
+
+
+class SingleFlight:
+    """Per-process registry of in-flight calls, keyed by any hashable."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders: Dict[str, int] = {}
+        self.followers: Dict[str, int] = {}
+
+    async def do(self, function: str, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs call() unless an identical one is in flight, and returns its result."""
+        future = self._calls.get(key)
+        if future is not None:
+            self.followers[function] = self.followers.get(function, 0) + 1
+            singleflight_requests_total.inc(function, "follower")
+            try:
+                # shield: a follower that is cancelled must not cancel the shared call
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                return await call()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders[function] = self.leaders.get(function, 0) + 1
+        singleflight_requests_total.inc(function, "leader")
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            # Followers run the call themselves instead of inheriting the cancellation
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+            # Mark a shared exception as retrieved: there may be no follower to await it
+            if not future.cancelled():
+                future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls run (leaders) and calls that shared a result (followers), per function."""
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "leaders": dict(self.leaders),
+            "followers": dict(self.followers),
+            "coalesced_total": sum(self.followers.values()),
+        }
+
+
+# Shared by the read functions in crud.country
+read_flight = SingleFlight("reads")
+
+
+def coalesce(function: Callable) -> Callable:
+    """
+    Decorator for async read functions taking a `session` argument: concurrent
+    calls with equal other arguments share one execution. The followers'
+    sessions are never used, so they don't check out a connection.
+    """
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        if not SINGLE_FLIGHT_ENABLED:
+            return await function(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        session = arguments.pop("session")
+        key = (function.__name__, current_generation(), session.info.get("replica", False), tuple(arguments.items()))
+        return await read_flight.do(function.__name__, key, lambda: function(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from io import BytesIO # Used for in-memory binary streams
+from typing import Awaitable, Callable, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont # Requires 'Pillow' installed
+from .metrics import registry
+from ..sec import SUMMARY_TIMESTAMP_GRANULARITY
+
+IMG_WIDTH, IMG_HEIGHT = 800, 400
+
+# Loaded once (at startup via load_font) instead of on every render
+_font: Optional[ImageFont.ImageFont] = None
+
+# Hash and bytes of the last rendered image, reused when the inputs are unchanged
+_last_render: Tuple[Optional[str], Optional[bytes]] = (None, None)
+
+summary_render_seconds = registry.histogram(
+    "summary_render_seconds", "Time spent rendering the summary PNG off the event loop",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+summary_render_reused_total = registry.counter(
+    "summary_render_reused_total", "Summary renders skipped because the inputs were unchanged")
+
+
+def load_font() -> ImageFont.ImageFont:
+    """Loads the summary font once per process."""
+    global _font
+    if _font is None:
+        _font = ImageFont.load_default()
+    return _font
+
+
+def truncate_timestamp(value: datetime, granularity: int = SUMMARY_TIMESTAMP_GRANULARITY) -> datetime:
+    """Rounds the displayed refresh time down so refreshes within one window render identically."""
+    seconds_of_day = value.hour * 3600 + value.minute * 60 + value.second
+    return value.replace(microsecond=0) - timedelta(seconds=seconds_of_day % max(1, granularity))
+
+
+def summary_hash(summary_text: str) -> str:
+    """Content hash of the render inputs (count, top 5 and truncated timestamp are all in the text)."""
+    return hashlib.sha256(summary_text.encode()).hexdigest()
+
+
+def _render_png(summary_text: str) -> bytes:
+    """CPU-bound part: draw the text and PNG-encode it. Runs in a worker thread."""
+    img = Image.new('RGB', (IMG_WIDTH, IMG_HEIGHT), color=(255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.text((10, 10), summary_text, fill=(0, 0, 0), font=load_font())
+
+    # Create an in-memory binary stream and save the image content (PNG format) to it
+    img_byte_arr = BytesIO()
+    img.save(img_byte_arr, format='PNG')
+    return img_byte_arr.getvalue()
+
+
+async def render_summary_image(summary_text: str, previous_text: Optional[str] = None, load_previous: Optional[Callable[[], Awaitable[Optional[bytes]]]] = None) -> Tuple[bytes, str, float]:
+    """
+    Returns (png_bytes, input_hash, render_seconds).
+
+    Reuses the last in-process render, or the stored image (fetched through
+    load_previous) when the stored previous_text hashes the same; otherwise
+    renders in a worker thread so the event loop keeps serving requests.
+    """
+    global _last_render
+    input_hash = summary_hash(summary_text)
+
+    if _last_render[0] == input_hash and _last_render[1]:
+        summary_render_reused_total.inc()
+        return _last_render[1], input_hash, 0.0
+    if previous_text is not None and load_previous is not None and summary_hash(previous_text) == input_hash:
+        previous_bytes = await load_previous()
+        if previous_bytes:
+            summary_render_reused_total.inc()
+            _last_render = (input_hash, previous_bytes)
+            return previous_bytes, input_hash, 0.0
+
+    start = time.perf_counter()
+    image_bytes = await asyncio.to_thread(_render_png, summary_text)
+    render_seconds = time.perf_counter() - start
+    summary_render_seconds.observe(render_seconds)
+
+    _last_render = (input_hash, image_bytes)
+    return image_bytes, input_hash, render_seconds
@@ -0,0 +1,177 @@
+import asyncio
+import random
+import string
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..sec import (
+    SYNTHETIC_ROWS, SYNTHETIC_SEED, SYNTHETIC_CURRENCIES, SYNTHETIC_CURRENCY_SKEW,
+    SYNTHETIC_REGIONS, SYNTHETIC_INVALID_RATE, SYNTHETIC_COLLISION_RATE, SYNTHETIC_CHURN_RATE,
+)
+
+# Synthetic country data for scale and soak testing (COUNTRY_SOURCE=synthetic).
+# Payloads have the same shape as restcountries.com v2 and open.er-api.com, are
+# deterministic for a given seed, and are generated lazily so 10^6 rows never
+# have to be held in memory at once.
+
+INVALID_KINDS = ("missing_currency", "null_population", "missing_name", "unknown_currency")
+
+
+def parse_regions(spec: List[str]) -> List[Tuple[str, float]]:
+    """Parses ["Africa:24", "Europe:21", "Asia"] into (region, weight) pairs (weight defaults to 1)."""
+    regions = []
+    for item in spec:
+        name, _, weight = item.partition(":")
+        if name.strip():
+            regions.append((name.strip(), float(weight) if weight else 1.0))
+    return regions
+
+
+def currency_codes(count: int) -> List[str]:
+    """count distinct three-letter codes: AAA, AAB, ..."""
+    letters = string.ascii_uppercase
+    return [letters[i // 676 % 26] + letters[i // 26 % 26] + letters[i % 26] for i in range(count)]
+
+
+class SyntheticDataset:
+    """
+    Generator of restcountries-shaped country records and the matching
+    open.er-api-shaped rates.
+
+    - regions: (name, weight) pairs the region is drawn from
+    - currencies: number of currencies with a rate; usage follows a Zipf-like
+      distribution with exponent currency_skew (0 = uniform)
+    - invalid_rate: share of records made invalid (missing currency, null
+      population, missing name) or pointing at a currency without a rate
+    - collision_rate: share of records reusing an earlier name in another
+      letter case (they normalize to the same country; the first one wins)
+    - churn_rate / revision: each revision changes the population of that
+      share of rows, so repeated refreshes have real updates to write
+    """
+
+    def __init__(
+        self,
+        rows: int = SYNTHETIC_ROWS,
+        seed: int = SYNTHETIC_SEED,
+        currencies: int = SYNTHETIC_CURRENCIES,
+        currency_skew: float = SYNTHETIC_CURRENCY_SKEW,
+        regions: Optional[List[Tuple[str, float]]] = None,
+        invalid_rate: float = SYNTHETIC_INVALID_RATE,
+        collision_rate: float = SYNTHETIC_COLLISION_RATE,
+        churn_rate: float = SYNTHETIC_CHURN_RATE,
+        revision: int = 0,
+    ):
+        self.rows = rows
+        self.seed = seed
+        self.regions = regions if regions is not None else parse_regions(SYNTHETIC_REGIONS)
+        self.invalid_rate = invalid_rate
+        self.collision_rate = collision_rate
+        self.churn_rate = churn_rate
+        self.revision = revision
+        self.codes = currency_codes(max(1, currencies))
+        self.currency_weights = [1.0 / (rank + 1) ** currency_skew for rank in range(len(self.codes))]
+        # Codes countries may use that have no rate (Rule 3: GDP stays null)
+        self.unknown_codes = currency_codes(len(self.codes) + 10)[len(self.codes):]
+
+    def rates_payload(self) -> Dict[str, Any]:
+        """open.er-api.com /v6/latest/USD shaped payload."""
+        rng = random.Random(f"{self.seed}:rates")
+        rates = {code: round(rng.lognormvariate(2.0, 2.0), 6) for code in self.codes}
+        rates[self.codes[0]] = 1.0
+        return {
+            "result": "success",
+            "provider": "synthetic",
+            "base_code": self.codes[0],
+            "time_last_update_unix": 0,
+            "rates": rates,
+        }
+
+    def iter_countries(self) -> Iterator[Dict[str, Any]]:
+        """Yields restcountries.com v2 shaped records, deterministically for the seed."""
+        rng = random.Random(self.seed)
+        churn = random.Random(f"{self.seed}:churn:{self.revision}")
+        region_names = [name for name, _ in self.regions]
+        region_weights = [weight for _, weight in self.regions]
+
+        for i in range(self.rows):
+            # Draw every field on every row so the stream stays aligned across options
+            region = rng.choices(region_names, region_weights)[0] if region_names else None
+            code = rng.choices(self.codes, self.currency_weights)[0]
+            population = rng.randint(1_000, 1_500_000_000)
+            quirk = rng.random()
+            quirk_pick = rng.random()
+            collide_with = rng.randrange(i) if i else 0
+
+            if self.revision and churn.random() < self.churn_rate:
+                population += churn.randint(1, 10_000)
+
+            name = f"Synthland {i}"
+            if quirk < self.collision_rate and i:
+                name = f"synthland {collide_with}".upper() if quirk_pick < 0.5 else f"synthland {collide_with}"
+
+            country = {
+                "name": name,
+                "capital": f"Capital {i}",
+                "region": region,
+                "population": population,
+                "flag": f"https://flags.example/{i}.svg",
+                "currencies": [{"code": code, "name": f"Currency {code}", "symbol": code}],
+                "independent": True,
+            }
+
+            invalid_threshold = self.collision_rate + self.invalid_rate
+            if self.collision_rate <= quirk < invalid_threshold:
+                kind = INVALID_KINDS[int(quirk_pick * len(INVALID_KINDS))]
+                if kind == "missing_currency":
+                    country["currencies"] = []
+                elif kind == "null_population":
+                    country["population"] = None
+                elif kind == "missing_name":
+                    country["name"] = ""
+                else:
+                    unknown = self.unknown_codes[int(quirk_pick * 1000) % len(self.unknown_codes)]
+                    country["currencies"] = [{"code": unknown, "name": "Unlisted", "symbol": "?"}]
+            yield country
+
+    def countries_payload(self) -> List[Dict[str, Any]]:
+        """The whole countries array (for buffered callers and fixtures)."""
+        return list(self.iter_countries())
+
+
+class SyntheticCountryStream:
+    """
+    Drop-in for utils.country.CountryStream backed by a SyntheticDataset:
+    same exchange_rates / batches() / changed / aclose() interface.
+    """
+
+    def __init__(self, dataset: SyntheticDataset):
+        self.dataset = dataset
+        self.exchange_rates = dataset.rates_payload()["rates"]
+        # No validators to compare against: every refresh is applied (the diff
+        # still skips rows that did not change)
+        self.changed = True
+
+    async def batches(self, batch_size: int):
+        batch: List[Dict[str, Any]] = []
+        for country in self.dataset.iter_countries():
+            batch.append(country)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                # Generation is CPU-bound; let other requests run between batches
+                await asyncio.sleep(0)
+        if batch:
+            yield batch
+
+    async def aclose(self) -> None:
+        return None
+
+
+# Revision of the synthetic data: bumped per refresh so SYNTHETIC_CHURN_RATE takes effect
+_revision = 0
+
+
+def next_synthetic_dataset() -> SyntheticDataset:
+    """Dataset for the next refresh from the SYNTHETIC_* settings."""
+    global _revision
+    dataset = SyntheticDataset(revision=_revision)
+    _revision += 1
+    return dataset
@@ -0,0 +1,82 @@
+"""
+Checks that the NumPy columnar country pipeline returns exactly what the
+per-row reference returns for the same seed, then times both.
+
+Usage (from the repository root):
+    python benchmarks/bench_gdp.py --rows 200000 --seed 42
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app.sec requires DATABASE_URL; no database is used here
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from app.utils.country import process_country_payload  # noqa: E402
+
+
+def synthetic_payload(rows: int, seed: int):
+    """Country/rate payload covering every business rule and validation branch."""
+    rng = random.Random(seed)
+    codes = [f"C{i:02d}" for i in range(60)]
+    rates = {code: round(rng.uniform(0.1, 2000.0), 4) for code in codes[:50]}
+    rates[codes[0]] = 0  # zero rate: GDP 0.0
+    countries = []
+    for i in range(rows):
+        kind = i % 20
+        country = {
+            "name": f"Country {i}" if kind != 1 else "",
+            "capital": f"Capital {i}",
+            "region": rng.choice(["Africa", "Americas", "Asia", "Europe", "Oceania"]),
+            "population": rng.randint(0, 1_500_000_000),
+            "flag": f"https://flags.example/{i}.svg",
+            "currencies": [{"code": rng.choice(codes)}],
+        }
+        if kind == 2:
+            country["currencies"] = []  # no currency: GDP 0.0, invalid
+        elif kind == 3:
+            country["population"] = None  # invalid
+        elif kind == 4:
+            del country["population"]  # invalid
+        elif kind == 5:
+            country["currencies"] = [{"name": "no code"}]  # invalid
+        countries.append(country)
+    return countries, rates
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(rows: int, seed: int) -> None:
+    countries, rates = synthetic_payload(rows, seed)
+    # Warm up: the first columnar call pays the numpy import
+    process_country_payload(countries[:10], rates, seed=seed, backend="numpy")
+    reference, reference_ms = timed(process_country_payload, countries, rates, seed=seed, backend="python")
+    columnar, columnar_ms = timed(process_country_payload, countries, rates, seed=seed, backend="numpy")
+
+    if reference != columnar:
+        for label, a, b in (("valid", reference[0], columnar[0]), ("invalid", reference[1], columnar[1])):
+            mismatch = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), None)
+            if len(a) != len(b) or mismatch is not None:
+                print(f"{label}: {len(a)} vs {len(b)} rows, first mismatch at {mismatch}")
+                if mismatch is not None:
+                    print(f"  reference {a[mismatch]}\n  columnar  {b[mismatch]}")
+        sys.exit("columnar output differs from the per-row reference")
+
+    print(f"{rows} rows: {len(reference[0])} valid, {len(reference[1])} invalid; outputs identical")
+    print(f"per-row   {reference_ms:10.1f} ms")
+    print(f"columnar  {columnar_ms:10.1f} ms  ({reference_ms / columnar_ms:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    main(args.rows, args.seed)
@@ -0,0 +1,98 @@
+"""
+Compares GET /countries throughput across the list serialization modes:
+
+  pydantic     FAST_JSON_RESPONSES=false: ORM rows validated against
+               List[Count] and encoded by FastAPI (the previous behaviour)
+  fast-json    pre-encoded bodies with the standard library json module
+  fast-orjson  pre-encoded bodies with orjson (skipped if not installed)
+
+Each mode runs in its own process (settings are read at import) against a
+throwaway SQLite database filled from the synthetic country source. The
+"uncached" scenarios bump the data generation before every request, so they
+measure query + serialization; the cached ones measure the per-generation
+response cache.
+
+Usage (from the repository root):
+    python benchmarks/bench_serialization.py --rows 10000 --iterations 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    "pydantic": {"FAST_JSON_RESPONSES": "false"},
+    "fast-json": {"FAST_JSON_RESPONSES": "true", "JSON_ENCODER": "json"},
+    "fast-orjson": {"FAST_JSON_RESPONSES": "true", "JSON_ENCODER": "orjson"},
+}
+
+
+async def run_worker(iterations):
+    # Imported here: the environment of the mode has to be set first
+    sys.path.insert(0, HERE)
+    import httpx
+    from suite import QueryCounter, measure_requests
+    from app.main import app
+    from app.utils.cache import bump_generation
+
+    counter = QueryCounter()
+    results = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            await client.post("/countries/refresh", params={"wait": "true"})
+            page = {"sort": "gdp_desc", "limit": 500}
+            results["list_cached"] = await measure_requests(client, counter, "GET", "/countries", iterations)
+            results["list_uncached"] = await measure_requests(client, counter, "GET", "/countries", iterations, before=bump_generation)
+            results["page_uncached"] = await measure_requests(
+                client, counter, "GET", "/countries", iterations * 10, before=bump_generation, params=page)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=50, help="requests per list scenario (x10 for pages)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_worker(args.iterations))))
+        return
+
+    try:
+        import orjson  # noqa: F401
+        modes = list(MODES)
+    except ImportError:
+        modes = [mode for mode in MODES if mode != "fast-orjson"]
+
+    report = {}
+    for mode in modes:
+        env = {
+            **os.environ,
+            **MODES[mode],
+            "COUNTRY_SOURCE": "synthetic",
+            "SYNTHETIC_ROWS": str(args.rows),
+            "GDP_RANDOM_SEED": "42",
+        }
+        env.pop("DATABASE_URL", None)  # always a fresh SQLite file (see suite.py)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", "--rows", str(args.rows), "--iterations", str(args.iterations)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        report[mode] = json.loads(output.strip().splitlines()[-1])
+
+    baseline = report["pydantic"]
+    print(f"{args.rows} rows")
+    for scenario in baseline:
+        for mode in modes:
+            value = report[mode][scenario]
+            speedup = value["throughput_rps"] / baseline[scenario]["throughput_rps"]
+            print(f"{scenario:<14} {mode:<12} {value['throughput_rps']:>9.1f} req/s  p50 {value['p50_ms']:>8.2f} ms  x{speedup:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+# Settings are read when app.sec is imported, so the test environment is set
+# up before any test module imports the app: a throwaway SQLite primary and
+# two SQLite "replicas", the first of which cannot be opened (missing directory)
+TEST_DB_DIR = tempfile.mkdtemp(prefix="country-api-tests-")
+PRIMARY_DB = os.path.join(TEST_DB_DIR, "primary.db")
+DEAD_REPLICA_DB = os.path.join(TEST_DB_DIR, "missing", "replica0.db")
+REPLICA_DB = os.path.join(TEST_DB_DIR, "replica1.db")
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{PRIMARY_DB}"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite+aiosqlite:///{DEAD_REPLICA_DB},sqlite+aiosqlite:///{REPLICA_DB}"
+os.environ["REPLICA_RETRY_SECONDS"] = "3600"
+# Replica reads right after a write are not cached within the lag window; with
+# no real replication, a zero window keeps tests independent of their order
+os.environ["REPLICA_MAX_LAG_SECONDS"] = "0"
+os.environ["STATE_SYNC_INTERVAL_SECONDS"] = "3600"
+os.environ["REFRESH_INTERVAL_SECONDS"] = "0"
+
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+
+class FakeUpstream:
+    """Stands in for restcountries.com and open.er-api.com; tests edit countries/rates."""
+
+    def __init__(self):
+        self.countries = []
+        self.rates = {"TST": 2.0}
+
+    def handle(self, request):
+        if "restcountries" in str(request.url):
+            return httpx.Response(200, json=self.countries)
+        return httpx.Response(200, json={"result": "success", "rates": self.rates})
+
+
+def make_country(name, population=100, currency="TST", region="Testing"):
+    """restcountries.com v2 shaped record."""
+    return {
+        "name": name, "capital": "Capital", "region": region, "population": population,
+        "flag": None, "currencies": [{"code": currency}] if currency else [],
+    }
+
+
+async def clear_tables():
+    from sqlmodel import delete
+    from app.databasesetup import async_session
+    from app.model.country_table import Country, CountryAggregate, RefreshJob, SummaryCache, SummaryImage
+    from app.utils.cache import bump_generation
+    from app.utils.image_cache import expire_image
+
+    async with async_session() as session:
+        for model in (Country, CountryAggregate, SummaryCache, SummaryImage, RefreshJob):
+            await session.execute(delete(model))
+        await session.commit()
+    bump_generation()
+    expire_image(None)
+
+
+async def seed_countries(*countries):
+    """Stores Country rows directly (e.g. with chosen GDPs) and invalidates the read caches."""
+    from app.databasesetup import async_session
+    from app.utils.cache import bump_generation
+
+    async with async_session() as session:
+        session.add_all(countries)
+        await session.commit()
+    bump_generation()
+
+
+@pytest.fixture(scope="module")
+def primary_client():
+    """App client on emptied tables whose reads all go to the primary (X-Consistency)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app, headers={"X-Consistency": "primary"}) as test_client:
+        test_client.portal.call(clear_tables)
+        yield test_client
+
+
+@pytest.fixture()
+def upstream(primary_client, monkeypatch):
+    """Routes the refresh's upstream requests to a FakeUpstream."""
+    from app.utils import country as country_utils
+
+    fake = FakeUpstream()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    monkeypatch.setattr(country_utils, "_http_client", client)
+    yield fake
+    primary_client.portal.call(client.aclose)
+
+
+@pytest.fixture()
+def in_session(primary_client):
+    """Runs fn(session) on emptied tables in the app's event loop, then commits; returns fn's result."""
+    from app.databasesetup import async_session
+
+    primary_client.portal.call(clear_tables)
+
+    def run(fn):
+        async def call():
+            async with async_session() as session:
+                result = await fn(session)
+                await session.commit()
+                return result
+        return primary_client.portal.call(call)
+
+    return run
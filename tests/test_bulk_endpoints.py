@@ -0,0 +1,81 @@
+import pytest
+from conftest import clear_tables, make_country
+
+
+@pytest.fixture()
+def seeded(primary_client, upstream):
+    """Five countries in two regions, written by a refresh (so the aggregates exist)."""
+    primary_client.portal.call(clear_tables)
+    upstream.countries = [
+        make_country("Aland", region="North"),
+        make_country("Bland", region="North"),
+        make_country("Cland", region="North"),
+        make_country("Dland", region="South", currency="SSS"),
+        make_country("Eland", region="South", currency="SSS"),
+    ]
+    upstream.rates = {"TST": 2.0, "SSS": 4.0}
+    response = primary_client.post("/countries/refresh", params={"wait": "true", "force": "true"})
+    assert response.status_code == 201, response.text
+    return primary_client
+
+
+def region_count(client, region):
+    response = client.get(f"/countries/aggregates/regions/{region}")
+    return response.json()["country_count"] if response.status_code == 200 else response.status_code
+
+
+def test_batch_lookup_keeps_request_order(seeded):
+    # Case-insensitive, and a name asked twice is returned once
+    response = seeded.post("/countries/batch", json={"names": ["bland", "Nowhere", "ALAND", "Bland"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [country["name"] for country in body["countries"]] == ["Bland", "Aland"]
+    assert body["not_found"] == ["Nowhere"]
+
+
+@pytest.mark.parametrize("body", [{}, {"names": []}, {"names": ["Aland", "  "]}])
+def test_batch_lookup_rejects_empty_requests(seeded, body):
+    response = seeded.post("/countries/batch", json=body)
+    assert response.status_code == 400
+    assert response.json()["error"] == "Validation failed"
+
+
+@pytest.mark.parametrize("body", [{}, {"names": []}, {"region": " "}, {"names": ["Aland"], "region": "North"}])
+def test_bulk_delete_rejects_empty_or_mixed_requests(seeded, body):
+    response = seeded.post("/countries/bulk-delete", json=body)
+    assert response.status_code == 400
+    assert region_count(seeded, "north") == 3
+
+
+def test_bulk_delete_by_name_rebuilds_aggregates(seeded):
+    response = seeded.post("/countries/bulk-delete", json={"names": ["aland", "Nowhere", "ALAND", "Dland"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["deleted"] == 2
+    assert body["results"] == [
+        {"name": "aland", "status": "deleted"},
+        {"name": "Nowhere", "status": "not_found"},
+        {"name": "Dland", "status": "deleted"},
+    ]
+    assert response.headers["X-Data-Generation"] == str(body["data_generation"])
+
+    assert seeded.get("/countries/aland").status_code == 404
+    assert (region_count(seeded, "north"), region_count(seeded, "south")) == (2, 1)
+    assert seeded.get("/countries/aggregates/currencies/sss").json()["country_count"] == 1
+
+
+def test_bulk_delete_by_filter_removes_the_aggregate(seeded):
+    response = seeded.post("/countries/bulk-delete", json={"region": "south", "currency": "sss"})
+    assert response.status_code == 200
+    assert sorted(result["name"] for result in response.json()["results"]) == ["Dland", "Eland"]
+
+    assert (region_count(seeded, "north"), region_count(seeded, "south")) == (3, 404)
+    assert seeded.get("/status").json()["total_countries"] == 3
+
+
+def test_bulk_delete_of_unknown_names_changes_nothing(seeded):
+    response = seeded.post("/countries/bulk-delete", json={"names": ["Nowhere"]})
+    assert response.status_code == 200
+    assert response.json()["deleted"] == 0
+    assert response.json()["results"] == [{"name": "Nowhere", "status": "not_found"}]
+    assert seeded.get("/status").json()["total_countries"] == 5
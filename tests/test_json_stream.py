@@ -0,0 +1,50 @@
+import asyncio
+import json
+import pytest
+from app.utils.json_stream import iter_json_array, JSONStreamError
+
+DOCUMENT = [
+    {"name": "Côte d'Ivoire", "population": 26378275, "gdp": 1.5e3, "flag": None},
+    12345678901234567890,
+    -0.000123,
+    "a \"quoted\", [bracketed] string",
+    [1, [2, {"nested": []}]],
+    True,
+]
+
+
+async def _chunks(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def parse(data, size):
+    async def collect():
+        return [value async for value in iter_json_array(_chunks(data, size))]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 64, 4096])
+def test_elements_survive_any_chunk_boundary(size):
+    # Numbers, escapes and multi-byte UTF-8 characters are split across chunks
+    data = json.dumps(DOCUMENT, indent=1, ensure_ascii=False).encode()
+    assert parse(data, size) == DOCUMENT
+
+
+@pytest.mark.parametrize("data", [b"[]", b"  [ ]  ", b"\n[\n]\n"])
+def test_empty_arrays(data):
+    assert parse(data, 1) == []
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b'{"name": "X"}',
+    b'[{"name": "X"}, {bad',
+    b"[1, 2",
+    b"[1 2]",
+    b"[1,]",
+    b"[1] [2]",
+])
+def test_malformed_documents_raise(data):
+    with pytest.raises(JSONStreamError):
+        parse(data, 3)
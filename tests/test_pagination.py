@@ -0,0 +1,81 @@
+from datetime import datetime
+import pytest
+from conftest import clear_tables, seed_countries
+from app.model.country_table import Country
+
+# (id, name, estimated_gdp): ties on the GDP are broken by id, NULLs included
+ROWS = [
+    ("id-a", "Atie", 500.0),
+    ("id-c", "Ctie", 500.0),
+    ("id-b", "Btie", 500.0),
+    ("id-d", "Dlow", 100.0),
+    ("id-e", "Ehigh", 900.0),
+    ("id-f", "Fnull", None),
+    ("id-g", "Gnull", None),
+]
+
+
+@pytest.fixture(scope="module")
+def client(primary_client):
+    primary_client.portal.call(clear_tables)
+    primary_client.portal.call(seed_countries, *[
+        Country(
+            id=country_id, name=name, capital="C", region="Testing", population=10, currency_code="TST",
+            exchange_rate=1.0, estimated_gdp=gdp, flag=None, last_refreshed_at=datetime.utcnow(),
+        )
+        for country_id, name, gdp in ROWS
+    ])
+    return primary_client
+
+
+def collect_pages(client, limit, **params):
+    """Follows X-Next-Cursor to the end; returns the names and the number of pages."""
+    names, pages, cursor = [], 0, None
+    while True:
+        query = {**params, "limit": limit}
+        if cursor is not None:
+            query["cursor"] = cursor
+        response = client.get("/countries", params=query)
+        assert response.status_code == 200, response.text
+        names += [country["name"] for country in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return names, pages
+
+
+def expected(descending):
+    with_gdp = sorted((row for row in ROWS if row[2] is not None), key=lambda row: (row[2], row[0]), reverse=descending)
+    without_gdp = sorted((row for row in ROWS if row[2] is None), key=lambda row: row[0], reverse=descending)
+    ordered = with_gdp + without_gdp if descending else without_gdp + with_gdp
+    return [row[1] for row in ordered]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_gdp_desc_pages_break_ties_on_id(client, limit):
+    names, pages = collect_pages(client, limit, sort="gdp_desc")
+    assert names == expected(descending=True)
+    assert names[1:4] == ["Ctie", "Btie", "Atie"]
+    # No empty trailing page: the cursor is only sent when more rows follow
+    assert pages == -(-len(ROWS) // limit)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_gdp_asc_pages_start_with_nulls(client, limit):
+    names, _ = collect_pages(client, limit, sort="gdp_asc")
+    assert names == expected(descending=False)
+    assert names[:2] == ["Fnull", "Gnull"]
+
+
+def test_name_pages(client):
+    names, _ = collect_pages(client, 3)
+    assert names == sorted(row[1] for row in ROWS)
+
+
+def test_cursor_of_another_sort_is_rejected(client):
+    cursor = client.get("/countries", params={"sort": "gdp_desc", "limit": 2}).headers["X-Next-Cursor"]
+    response = client.get("/countries", params={"sort": "gdp_asc", "limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"]["details"] == {"cursor": "is invalid"}
+
+    assert client.get("/countries", params={"limit": 2, "cursor": "not-a-cursor"}).status_code == 400
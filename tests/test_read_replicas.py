@@ -0,0 +1,140 @@
+import math
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlmodel import SQLModel, Session
+from conftest import PRIMARY_DB, REPLICA_DB
+from app import databasesetup
+from app.main import app
+from app.model.country_table import Country
+from app.utils.cache import current_generation
+
+
+def _seed(path, name):
+    """Creates the schema in a SQLite file and stores one country, so each database is recognizable."""
+    sync_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(sync_engine)
+    with Session(sync_engine) as session:
+        session.add(Country(
+            name=name, capital="C", region="Testing", population=10, currency_code="TST",
+            exchange_rate=1.0, estimated_gdp=15000.0, flag=None, last_refreshed_at=datetime.utcnow(),
+        ))
+        session.commit()
+    sync_engine.dispose()
+
+
+class PoolWatcher:
+    """Counts connection checkouts on an async engine and the peak held at once."""
+
+    def __init__(self, async_engine):
+        self.target = async_engine.sync_engine
+        self.checkouts = 0
+        self.held = 0
+        self.peak = 0
+        event.listen(self.target, "checkout", self._checkout)
+        event.listen(self.target, "checkin", self._checkin)
+
+    def remove(self):
+        event.remove(self.target, "checkout", self._checkout)
+        event.remove(self.target, "checkin", self._checkin)
+
+    def _checkout(self, *args):
+        self.checkouts += 1
+        self.held += 1
+        self.peak = max(self.peak, self.held)
+
+    def _checkin(self, *args):
+        self.held -= 1
+
+    def reset(self):
+        self.checkouts = 0
+        self.peak = self.held
+
+
+@pytest.fixture(scope="module")
+def client():
+    _seed(PRIMARY_DB, "Primaryland")
+    _seed(REPLICA_DB, "Replicaland")
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture()
+def watchers():
+    pair = (PoolWatcher(databasesetup.engine), PoolWatcher(databasesetup.replica_engines[1]))
+    yield pair
+    for watcher in pair:
+        watcher.remove()
+
+
+def test_reads_skip_the_dead_replica(client):
+    for _ in range(3):
+        assert client.get("/countries/replicaland").status_code == 200
+        assert client.get("/countries/primaryland").status_code == 404
+    assert databasesetup._replica_down_until.get(0, 0) > 0
+    assert 1 not in databasesetup._replica_down_until
+
+
+def test_primary_when_asked(client):
+    response = client.get("/countries/primaryland", headers={"X-Consistency": "primary"})
+    assert response.status_code == 200
+
+
+def test_fresh_generation_token_reads_the_primary(client):
+    token = str(current_generation() + 1)
+    response = client.get("/countries/primaryland", headers={"X-Min-Generation": token})
+    assert response.status_code == 200
+
+
+def test_falls_back_to_the_primary_without_a_healthy_replica(client, monkeypatch):
+    for index in range(len(databasesetup.replica_engines)):
+        monkeypatch.setitem(databasesetup._replica_down_until, index, math.inf)
+    assert client.get("/countries/primaryland").status_code == 200
+
+
+def test_cached_reads_do_not_connect(client, watchers):
+    primary, replica = watchers
+    first = client.get("/countries")
+    assert first.status_code == 200
+    assert [country["name"] for country in first.json()] == ["Replicaland"]
+
+    primary.reset()
+    replica.reset()
+    second = client.get("/countries")
+    assert second.json() == first.json()
+    assert (primary.checkouts, replica.checkouts) == (0, 0)
+
+
+def test_stream_reads_through_the_request_session(client, watchers):
+    primary, replica = watchers
+    response = client.get("/countries", params={"stream": "true"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) == 1 and '"Replicaland"' in lines[0]
+    assert primary.checkouts == 0
+    # A routing probe, if due, returns its connection before the session takes one
+    assert replica.peak == 1
+
+
+def test_replica_health_is_reused_across_sessions(client, watchers):
+    primary, replica = watchers
+    assert client.get("/countries", params={"region": "Testing"}).status_code == 200
+    replica.reset()
+    # A different (uncached) read within REPLICA_HEALTH_TTL_SECONDS: no new probe
+    assert client.get("/countries", params={"currency": "TST"}).status_code == 200
+    assert (primary.checkouts, replica.checkouts) == (0, 1)
+
+
+def test_failing_query_marks_the_replica_down(client, monkeypatch):
+    # The dead replica is believed healthy (recent probe) and is the only one left
+    monkeypatch.setitem(databasesetup._replica_down_until, 0, 0)
+    monkeypatch.setitem(databasesetup._replica_down_until, 1, math.inf)
+    monkeypatch.setitem(databasesetup._replica_healthy_until, 0, math.inf)
+
+    assert client.get("/countries", params={"sort": "gdp_desc"}).status_code == 500
+    assert databasesetup._replica_down_until[0] > 0
+    assert 0 not in databasesetup._replica_healthy_until
+    # The next read skips it and falls back to the primary
+    names = [country["name"] for country in client.get("/countries", params={"sort": "gdp_asc"}).json()]
+    assert "Primaryland" in names and "Replicaland" not in names
@@ -0,0 +1,87 @@
+import pytest
+from conftest import clear_tables, make_country
+from app.crud import country as crud_country
+
+
+def refresh(client, force=True):
+    response = client.post("/countries/refresh", params={"wait": "true", "force": str(force).lower()})
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(primary_client):
+    primary_client.portal.call(clear_tables)
+
+
+@pytest.fixture()
+def small_chunks(monkeypatch):
+    # Two rows per diff/write chunk, so short payloads span several chunks
+    monkeypatch.setattr(crud_country, "REFRESH_BATCH_SIZE", 2)
+
+
+def test_duplicate_name_across_chunks_is_written_once(primary_client, upstream, small_chunks):
+    # "ALAND" normalizes to "Aland" and lands in the second chunk
+    upstream.countries = [
+        make_country("Aland", population=10),
+        make_country("Bland"),
+        make_country("Cland"),
+        make_country("ALAND", population=999),
+    ]
+    first = refresh(primary_client)
+    assert (first["valid_countries_inserted"], first["valid_countries_updated"]) == (3, 0)
+    assert first["duplicate_countries_skipped"] == 1
+    assert primary_client.get("/countries/aland").json()["population"] == 10
+
+    # The same payload again: nothing to write
+    second = refresh(primary_client)
+    assert (second["valid_countries_inserted"], second["valid_countries_updated"]) == (0, 0)
+    assert second["valid_countries_unchanged"] == 3
+    assert second["duplicate_countries_skipped"] == 1
+
+
+def test_missing_countries_deleted_within_guard(primary_client, upstream, small_chunks):
+    upstream.countries = [make_country(f"Gone{i}") for i in range(5)]
+    refresh(primary_client)
+
+    # One of five missing: within REFRESH_DELETE_MAX_FRACTION (0.2), deleted
+    upstream.countries = upstream.countries[1:]
+    result = refresh(primary_client)
+    assert (result["countries_deleted"], result["countries_delete_skipped"]) == (1, 0)
+    assert primary_client.get("/countries/gone0").status_code == 404
+
+    # Three of four missing: looks truncated, kept
+    upstream.countries = upstream.countries[3:]
+    result = refresh(primary_client)
+    assert (result["countries_deleted"], result["countries_delete_skipped"]) == (0, 3)
+    assert primary_client.get("/countries/gone1").status_code == 200
+
+
+def test_unchanged_body_larger_than_hash_buffer(primary_client, upstream, small_chunks, monkeypatch):
+    from app.utils import country as country_utils
+
+    upstream.countries = [make_country("Buffer", population=5), make_country("Overflow")]
+    refresh(primary_client)
+
+    # The body no longer fits the buffer: it is streamed, then rolled back on a hash match
+    monkeypatch.setattr(country_utils, "REFRESH_HASH_BUFFER_BYTES", 16)
+    assert refresh(primary_client, force=False)["status"] == "not_modified"
+
+    upstream.countries[0] = make_country("Buffer", population=6)
+    result = refresh(primary_client, force=False)
+    assert (result["status"], result["valid_countries_updated"]) == ("success", 1)
+    assert primary_client.get("/countries/buffer").json()["population"] == 6
+
+
+def test_refresh_without_changes_keeps_generation(primary_client, upstream):
+    upstream.countries = [make_country("Steady"), make_country("Still")]
+    first = refresh(primary_client)
+    before = primary_client.get("/status").json()
+
+    # Forced, so the body is diffed, but no row changes: no render, no new generation
+    second = refresh(primary_client)
+    assert (second["status"], second["valid_countries_unchanged"]) == ("success", 2)
+    assert second["data_generation"] == first["data_generation"]
+    assert second["summary_render_ms"] == 0.0
+    assert "aggregate" not in second["stage_timings_ms"]
+    assert primary_client.get("/status").json()["last_refreshed_at"] > before["last_refreshed_at"]
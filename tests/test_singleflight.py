@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from app.utils.cache import bump_generation
+from app.utils.singleflight import coalesce, read_flight
+
+
+class FakeSession:
+    def __init__(self, replica=False):
+        self.info = {"replica": replica}
+
+
+class Lookup:
+    """A coalesced read that records its calls and waits until released."""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.release = None
+
+    def build(self):
+        self.release = asyncio.Event()
+
+        @coalesce
+        async def lookup(name, session):
+            self.calls.append(name)
+            await self.release.wait()
+            if self.error is not None:
+                raise self.error
+            return f"{name}:{len(self.calls)}"
+
+        return lookup
+
+
+async def _start(*calls):
+    """Starts the calls and lets them all reach the single-flight registry."""
+    tasks = [asyncio.ensure_future(call) for call in calls]
+    for _ in range(3):
+        await asyncio.sleep(0)
+    return tasks
+
+
+def test_identical_calls_share_one_execution():
+    async def scenario():
+        lookup = Lookup()
+        fn = lookup.build()
+        tasks = await _start(fn("Aland", FakeSession()), fn("Aland", session=FakeSession()))
+        lookup.release.set()
+        return lookup.calls, await asyncio.gather(*tasks)
+
+    calls, results = asyncio.run(scenario())
+    assert calls == ["Aland"]
+    assert results == ["Aland:1", "Aland:1"]
+    assert not read_flight.stats()["in_flight"]
+
+
+def test_keys_isolate_arguments_session_kind_and_generation():
+    async def scenario():
+        lookup = Lookup()
+        fn = lookup.build()
+        tasks = await _start(
+            fn("Aland", FakeSession()),
+            fn("Bland", FakeSession()),              # other arguments
+            fn("Aland", FakeSession(replica=True)),  # replica session
+        )
+        bump_generation()
+        tasks += await _start(fn("Aland", FakeSession()))  # started after a write
+        lookup.release.set()
+        await asyncio.gather(*tasks)
+        return lookup.calls
+
+    assert asyncio.run(scenario()) == ["Aland", "Bland", "Aland", "Aland"]
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        lookup = Lookup(error=LookupError("boom"))
+        fn = lookup.build()
+        tasks = await _start(fn("Aland", FakeSession()), fn("Aland", FakeSession()))
+        lookup.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # The failure is not remembered: the next call runs again
+        lookup.error = None
+        retried = await fn("Aland", FakeSession())
+        return lookup.calls, results, retried
+
+    calls, results, retried = asyncio.run(scenario())
+    assert [type(result) for result in results] == [LookupError, LookupError]
+    assert calls == ["Aland", "Aland"]
+    assert retried == "Aland:2"
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        lookup = Lookup()
+        fn = lookup.build()
+        leader, follower = await _start(fn("Aland", FakeSession()), fn("Aland", FakeSession()))
+        leader.cancel()
+        await asyncio.sleep(0)
+        lookup.release.set()
+        return await follower, leader.cancelled()
+
+    result, cancelled = asyncio.run(scenario())
+    assert cancelled
+    assert result == "Aland:2"
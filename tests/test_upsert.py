@@ -0,0 +1,96 @@
+from datetime import datetime
+from sqlmodel import select
+from app.crud.diff import diff_country_batch, reset_seen_names, drop_seen_names
+from app.crud.upsert import normalize_country_record, upsert_countries
+from app.model.country_table import Country
+
+
+def record(name, **values):
+    """Processed country record, as the refresh hands it to the diff and the upsert."""
+    row = {
+        "name": name, "capital": "Capital", "region": "Testing", "population": 100,
+        "currency_code": "TST", "exchange_rate": 2.0, "estimated_gdp": 75000.0, "flag": None,
+    }
+    row.update(values)
+    return row
+
+
+async def stored_countries(session):
+    return {row.name: row for row in (await session.execute(select(Country))).scalars().all()}
+
+
+def upsert(in_session, rows, **kwargs):
+    async def write(session):
+        return await upsert_countries(session, rows, datetime.utcnow(), **kwargs)
+    return in_session(write)
+
+
+def diff(in_session, rows):
+    async def compare(session):
+        await reset_seen_names(session)
+        result = await diff_country_batch(session, rows)
+        await drop_seen_names(session)
+        return result
+    return in_session(compare)
+
+
+def test_upsert_counts_inserts_and_updates(in_session):
+    assert upsert(in_session, [record("Aland"), record("Bland")]) == {"inserted": 2, "updated": 0}
+
+    # Spread over batches of one row: each batch is looked up and written separately
+    result = upsert(in_session, [record("Aland", population=5), record("Cland")], batch_size=1)
+    assert result == {"inserted": 1, "updated": 1}
+
+    stored = in_session(stored_countries)
+    assert sorted(stored) == ["Aland", "Bland", "Cland"]
+    assert stored["Aland"].population == 5
+
+
+def test_upsert_matches_names_after_normalization(in_session):
+    upsert(in_session, [record("Aland")])
+
+    row = normalize_country_record(record("  ALAND ", currency_code="tst", region="testing", population=7))
+    assert (row["name"], row["currency_code"], row["region"]) == ("Aland", "TST", "Testing")
+    assert upsert(in_session, [row]) == {"inserted": 0, "updated": 1}
+
+    stored = in_session(stored_countries)
+    assert list(stored) == ["Aland"]
+    assert stored["Aland"].population == 7
+
+
+def test_upsert_writes_nulls(in_session):
+    # Rows with different NULL columns share one INSERT (render_nulls)
+    upsert(in_session, [
+        record("Nulland", capital=None, region=None, exchange_rate=None, estimated_gdp=None),
+        record("Fulland", flag="https://flags.example/fulland.svg"),
+    ])
+    stored = in_session(stored_countries)
+    nulland = stored["Nulland"]
+    assert (nulland.capital, nulland.region, nulland.exchange_rate, nulland.estimated_gdp) == (None, None, None, None)
+    assert stored["Fulland"].flag == "https://flags.example/fulland.svg"
+
+    # An update sets a column back to NULL rather than skipping it
+    assert upsert(in_session, [record("Fulland", flag=None)]) == {"inserted": 0, "updated": 1}
+    assert in_session(stored_countries)["Fulland"].flag is None
+
+
+def test_diff_tolerates_float_rounding(in_session):
+    upsert(in_session, [record("Floatland", exchange_rate=1.2345678)])
+
+    # Within FLOAT_REL_TOL, and estimated_gdp alone (derived) never marks a row dirty
+    result = diff(in_session, [record("Floatland", exchange_rate=1.23456781, estimated_gdp=1.0)])
+    assert (result["inserts"], result["updates"], result["unchanged"]) == ([], [], 1)
+
+    result = diff(in_session, [record("Floatland", exchange_rate=1.25), record("Newland")])
+    assert [row["name"] for row in result["inserts"]] == ["Newland"]
+    assert [row["name"] for row in result["updates"]] == ["Floatland"]
+    assert result["field_changes"]["exchange_rate"] == 1
+    assert result["updates"][0]["id"] == in_session(stored_countries)["Floatland"].id
+
+
+def test_diff_matches_names_case_insensitively(in_session):
+    upsert(in_session, [record("Aland")])
+
+    result = diff(in_session, [record("aLAND"), record("ALAND", population=9)])
+    assert (result["inserts"], result["updates"], result["unchanged"]) == ([], [], 1)
+    assert result["duplicates"] == 1